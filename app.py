@@ -3,20 +3,32 @@
 # Run this app with `python app.py` and
 # visit http://127.0.0.1:8050/ in your web browser.
 
+import os
 import dash
-from dash import html
 
-from components.header import header
-from components.sidebar import sidebar
-from components.about import about_box
-from components.body import body
+from components.layout import build_layout, LAYOUT_SETTINGS
+from components.body import render_section, clear_section_cache, load_sections
 
-from utils.get_data.refresh_data import refresh_data
-from dash.dependencies import Input, Output, State
-import visdcc
+from components.sections.forum import reload_forum_data
+from components.sections.open_phil import reload_op_grants
+from components.sections.donations_sankey import funding_fig, threshold_label, load_funding, reload_funding
+from utils.plots.serialize import figure_json, FIGURE_ENCODING, PLOTLY_JS_URL
+from utils.snapshot import read_snapshot
+
+from utils.get_data.refresh_data import refresh_data, start_refresh_scheduler
+from utils.get_data.data_version import read_data_version
+from dash.dependencies import Input, Output, State, MATCH, ClientsideFunction
+
+# Typed array figures (EADATA_FIGURE_ENCODING=typed) need a newer plotly.js
+# than the one dash bundles. dcc.Graph uses window.Plotly when it is already
+# loaded.
+external_scripts = [ PLOTLY_JS_URL ] if FIGURE_ENCODING == 'typed' else []
 
 app = dash.Dash(
     __name__,
+    external_scripts = external_scripts,
+    # Lazy sections' and virtual graphs' components aren't in the initial layout
+    suppress_callback_exceptions = True,
     meta_tags = [
         {
             'og:title': 'Effective Altruism Data',
@@ -34,34 +46,44 @@ app = dash.Dash(
 app.title = 'Effective Altruism Data'
 server = app.server
 
-# refresh_data()
-
-# def serve_layout():
-#     return html.Div(
-app.layout = html.Div(
-        [
-            header(),
-            html.Div(
-                [
-                    html.Div(
-                        [
-                            sidebar(),
-                        ],
-                    ),
-                    about_box(),
-                    body(),
-                    visdcc.Run_js(id='javascript-body'),
-                ],
-                className = 'body',
-                id = "sidebar-visdcc",
-            )
-        ],
+def load_layout(snapshot):
+    # From the snapshot built by build.py if there is one, otherwise live
+    clear_section_cache()
+    reload_funding()
+    if snapshot is None:
+        return build_layout()
+
+    layout, sections, datasets = snapshot
+    load_sections(sections)
+    load_funding(datasets['funding'])
+    return layout
+
+app.layout = load_layout(read_snapshot(read_data_version(), LAYOUT_SETTINGS))
+
+# The new layout is built in full before it replaces the old one, so a
+# request never sees a half-rebuilt layout.
+def load_data_version(version):
+    print(f'Loading data version {version}')
+    snapshot = read_snapshot(version, LAYOUT_SETTINGS)
+    if snapshot is None:
+        reload_forum_data()
+        reload_op_grants()
+    app.layout = load_layout(snapshot)
+
+# Every serving process polls for new data versions: the gunicorn workers
+# (see gunicorn.conf.py) and `python app.py`, but not scripts that only
+# import the app, like export.py. Whichever worker holds the refresh lock
+# fetches on boot and then hourly; set REFRESH_DATA=0 to only poll.
+def start_scheduler():
+    return start_refresh_scheduler(
+        load_data_version,
+        fetch = os.environ.get('REFRESH_DATA', '1') != '0',
     )
 
 @app.callback(
     Output('javascript-body', 'run'),
     [Input('sidebar-visdcc', 'n_clicks')])
-def sidebar(x):
+def sidebar_body_js(x):
     if x: 
         return "document.getElementById('sidebar').setAttribute('onclick', 'mobileSidebar()')"
     return ""
@@ -69,13 +91,36 @@ def sidebar(x):
 @app.callback(
     Output('javascript-header', 'run'),
     [Input('header-sidebar-visdcc', 'n_clicks')])
-def sidebar(x):
+def sidebar_header_js(x):
     if x: 
         return "document.getElementById('sidebar').setAttribute('onclick', 'mobileSidebar()')"
     return ""
 
-# app.layout = serve_layout
+@app.callback(
+    Output({'type': 'lazy-section', 'section': MATCH}, 'children'),
+    Input({'type': 'lazy-section', 'section': MATCH}, 'n_clicks'),
+    prevent_initial_call=True)
+def load_section(n_clicks):
+    return render_section(dash.ctx.triggered_id['section'])
+
+# Mounts or unmounts a virtual graph, see utils/plots/virtual.py
+app.clientside_callback(
+    ClientsideFunction(namespace='virtualGraphs', function_name='toggle'),
+    Output({'type': 'virtual-graph', 'graph': MATCH}, 'children'),
+    Input({'type': 'virtual-graph-toggle', 'graph': MATCH}, 'n_clicks'),
+    State({'type': 'virtual-graph-store', 'graph': MATCH}, 'data'),
+    prevent_initial_call=True)
+
+@app.callback(
+    Output('Donations', 'figure'),
+    Output('sankey-threshold-label', 'children'),
+    Input('sankey-threshold', 'value'),
+    prevent_initial_call=True)
+def sankey_threshold(log_threshold):
+    threshold = 10**log_threshold
+    return figure_json(funding_fig(threshold)), threshold_label(threshold)
 
 if __name__ == '__main__':
+    start_scheduler()
     #app.run_server(debug=True)
     app.run_server(debug=False)
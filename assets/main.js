@@ -73,3 +73,126 @@ window.matchMedia('(prefers-color-scheme: dark)').addListener(function (e) {
         setLightMode();
 });
 
+
+
+// LAZY SECTIONS
+
+// Each lazily rendered section starts as an empty placeholder inside its
+// .section wrapper. Clicking the placeholder fires the Dash callback that
+// fills it in. That happens once the wrapper comes within half a screen of
+// view, or straight away when a sidebar link to it is followed. The
+// placeholder itself has display: contents and no box of its own, so the
+// wrapper is what gets observed.
+
+let lazySectionObserver = null;
+
+function getScrollRoot() {
+    // On desktop the page scrolls inside .scroll-snapper, elsewhere the window
+    const snapper = document.querySelector(".scroll-snapper");
+    if (snapper && getComputedStyle(snapper).overflowY == "scroll")
+        return snapper;
+    return null;
+}
+
+function loadLazySection(section) {
+    const placeholder = section.querySelector(":scope > .lazy-section");
+    if (!placeholder || placeholder.dataset.loaded)
+        return;
+    placeholder.dataset.loaded = "true";
+    placeholder.click();
+}
+
+function loadLazySections(entries, observer) {
+    entries.forEach((entry) => {
+        if (entry.isIntersecting) {
+            observer.unobserve(entry.target);
+            loadLazySection(entry.target);
+        }
+    });
+}
+
+function observeLazySections() {
+    const sections = document.querySelectorAll(".section:not([data-observed])");
+    if (sections.length == 0)
+        return;
+
+    if (!lazySectionObserver) {
+        lazySectionObserver = new IntersectionObserver(loadLazySections, {
+            root: getScrollRoot(),
+            rootMargin: "50% 0px",
+        });
+    }
+
+    sections.forEach((section) => {
+        section.dataset.observed = "true";
+        if (section.querySelector(":scope > .lazy-section"))
+            lazySectionObserver.observe(section);
+    });
+}
+
+// Sidebar and other in-page links load their target section directly
+document.addEventListener("click", (event) => {
+    const link = event.target.closest('a[href^="#"]');
+    if (!link)
+        return;
+    const section = document.getElementById(link.getAttribute("href").slice(1));
+    if (section)
+        loadLazySection(section);
+});
+
+
+
+// VIRTUAL GRAPHS
+
+// Each graph is only mounted while it is within a screen of view. The
+// observer tracks whether a graph is mounted, and clicks its hidden toggle
+// whenever that should change; the clientside callback below mounts the
+// stored graph on odd clicks and unmounts it on even ones.
+
+let virtualGraphObserver = null;
+
+function toggleVirtualGraphs(entries) {
+    entries.forEach((entry) => {
+        const wrapper = entry.target;
+        const mounted = wrapper.dataset.mounted == "true";
+        if (entry.isIntersecting != mounted) {
+            wrapper.dataset.mounted = entry.isIntersecting;
+            wrapper.querySelector(".virtual-graph-toggle").click();
+        }
+    });
+}
+
+function observeVirtualGraphs() {
+    const wrappers = document.querySelectorAll(".virtual-graph:not([data-observed])");
+    if (wrappers.length == 0)
+        return;
+
+    if (!virtualGraphObserver) {
+        virtualGraphObserver = new IntersectionObserver(toggleVirtualGraphs, {
+            root: getScrollRoot(),
+            rootMargin: "100% 0px",
+        });
+    }
+
+    wrappers.forEach((wrapper) => {
+        wrapper.dataset.observed = "true";
+        virtualGraphObserver.observe(wrapper);
+    });
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    virtualGraphs: {
+        toggle: function(n_clicks, graph) {
+            return n_clicks % 2 ? graph : null;
+        },
+    },
+});
+
+// Dash renders the layout after the page loads, and lazy sections later still
+new MutationObserver(() => {
+    observeLazySections();
+    observeVirtualGraphs();
+}).observe(document.documentElement, {
+    childList: true,
+    subtree: true,
+});
@@ -0,0 +1,41 @@
+# Build the layout snapshot for the current data version, e.g. after each
+# refresh and before starting the workers:
+#
+#   python -m utils.get_data.refresh_data && python build.py
+#
+# On Heroku bin/post_compile runs it while the slug is built, so the
+# snapshot ships with every dyno instead of being rebuilt as each one starts.
+#
+# Workers that find a snapshot for their data version load it (see
+# utils/snapshot.py) instead of reading the raw data and building every
+# figure themselves.
+
+import time
+
+from components.body import SECTIONS, render_section
+from components.layout import build_layout, LAYOUT_SETTINGS
+from components.sections.donations_sankey import get_funding
+from utils.get_data.data_version import read_data_version
+from utils.snapshot import write_snapshot, data_stats
+
+def build_snapshot():
+
+    start = time.time()
+    version = read_data_version()
+    # Before reading any data, so a change during the build is caught later
+    sources = data_stats()
+
+    sections = {
+        section_id: render_section(section_id)
+        for section_id, _ in SECTIONS
+    }
+    datasets = {
+        'funding': get_funding(),
+    }
+
+    path = write_snapshot(version, build_layout(), sections, datasets, LAYOUT_SETTINGS, sources)
+    print(f'Built snapshot {path} in {time.time()-start:.1f}s')
+    return path
+
+if __name__ == '__main__':
+    build_snapshot()
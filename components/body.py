@@ -1,3 +1,4 @@
+import os
 import dash
 from dash import html
 
@@ -24,33 +25,90 @@ from components.sections.open_phil import openphil_grants_scatter_section
 from components.sections.open_phil import openphil_grants_categories_section
 from components.sections.open_phil import openphil_line_plot_section
 
-def body():
-    return html.Div(
-        [
+from utils.plots.virtual import virtualize, VIRTUAL_GRAPHS
+from utils.plots.figure_cache import figure_scope
+from utils.get_data.data_version import read_data_version
+
+# Every section in page order, with the id its builder gives it (which
+# the sidebar links to)
+SECTIONS = [
+    ('donations-sankey', donations_sankey_section),
+
+    ('op-grants-scatter-section', openphil_grants_scatter_section),
+    ('op-grants-categories', openphil_grants_categories_section),
+    ('op-grants-growth', openphil_line_plot_section),
+
+    ('gwwc-pledge-section', get_gwwc_pledges_section),
+    ('gwwc-donations-section', get_gwwc_donation_growth_section),
+    ('gwwc-orgs-section', get_gwwc_donations_orgs_section),
+
+    ('countries', country_total_section),
+    ('countries-per-capita', country_per_capita_section),
+
+    ('demographics', demographics_section),
+    ('beliefs-lifestyle', beliefs_section),
+    ('education', education_section),
+    ('careers', career_section),
+
+    ('forum-scatter-section', forum_scatter_section),
+    ('forum-growth-section', forum_count_section),
+    ('post-wilkinson-section', forum_post_wilkinson_section),
+    ('author-wilkinson-section', forum_user_wilkinson_section),
+]
 
-            donations_sankey_section(),
+SECTION_BUILDERS = dict(SECTIONS)
 
-            openphil_grants_scatter_section(),
-            openphil_grants_categories_section(),
-            openphil_line_plot_section(),
+# Graphs that are callback outputs, and so must stay mounted
+MOUNTED_GRAPHS = {'Donations'}
 
-            get_gwwc_pledges_section(),
-            get_gwwc_donation_growth_section(),
-            get_gwwc_donations_orgs_section(),
+# With lazy sections the layout holds only an empty placeholder for each
+# section. main.js clicks a placeholder when it nears the viewport, and the
+# load_section callback in app.py fills it in.
+LAZY_SECTIONS = os.environ.get('EADATA_LAZY_SECTIONS', '1') != '0'
 
-            country_total_section(),
-            country_per_capita_section(),
+# Built sections, cleared whenever a new data version is loaded
+section_cache = {}
 
-            demographics_section(),
-            beliefs_section(),
-            education_section(),
-            career_section(),
+def build_section(section_id):
+    section = SECTION_BUILDERS[section_id]()
+    if VIRTUAL_GRAPHS:
+        section = virtualize(section, section_id, keep_mounted=MOUNTED_GRAPHS)
+    return section
 
-            forum_scatter_section(),
-            forum_count_section(),
-            forum_post_wilkinson_section(),
-            forum_user_wilkinson_section(),
+def render_section(section_id):
+    if section_id not in section_cache:
+        # The data version is read once per section, not once per figure
+        with figure_scope(read_data_version()):
+            section_cache[section_id] = build_section(section_id).children
+    return section_cache[section_id]
 
-        ],
+def clear_section_cache():
+    section_cache.clear()
+
+def load_sections(sections):
+    # Built sections' children, e.g. from a layout snapshot
+    section_cache.update(sections)
+
+def lazy_section(section_id):
+    return html.Div(
+        html.Div(
+            id={'type': 'lazy-section', 'section': section_id},
+            className='lazy-section',
+        ),
+        className='section',
+        id=section_id,
+    )
+
+def body(lazy=LAZY_SECTIONS):
+    if lazy:
+        sections = [ lazy_section(section_id) for section_id, _ in SECTIONS ]
+    else:
+        sections = [
+            html.Div(render_section(section_id), className='section', id=section_id)
+            for section_id, _ in SECTIONS
+        ]
+
+    return html.Div(
+        sections,
         className = 'content scroll-snapper',
     )
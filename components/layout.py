@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+from dash import html
+import visdcc
+
+from components.header import header
+from components.sidebar import sidebar
+from components.about import about_box
+from components.body import body, LAZY_SECTIONS
+
+from utils.plots.serialize import FIGURE_ENCODING
+from utils.plots.virtual import VIRTUAL_GRAPHS
+from utils.data_cache import source_hash
+
+# The whole page. Kept out of app.py so build.py can build it without
+# creating the app and starting the refresh scheduler.
+def build_layout(lazy=LAZY_SECTIONS):
+    return html.Div(
+        [
+            header(),
+            html.Div(
+                [
+                    html.Div(
+                        [
+                            sidebar(),
+                        ],
+                    ),
+                    about_box(),
+                    body(lazy),
+                    visdcc.Run_js(id='javascript-body'),
+                ],
+                className = 'body',
+                id = "sidebar-visdcc",
+            )
+        ],
+    )
+
+# A snapshot is only used if it was built by the same code with the same settings
+LAYOUT_SETTINGS = {
+    'lazy_sections': LAZY_SECTIONS,
+    'virtual_graphs': VIRTUAL_GRAPHS,
+    'figure_encoding': FIGURE_ENCODING,
+    'source': source_hash(['app.py', 'components', 'utils']),
+}
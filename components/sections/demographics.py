@@ -9,10 +9,11 @@ from glob import glob
 from utils.plots.bar import Bar
 from utils.subtitle import get_data_source
 from utils.subtitle import get_instructions
+from utils.data_cache import cached_frame
+from utils.hover import hover_text
 
-def get_demo_table(demo_name):
+def process_demo_table(path):
 
-    path = f"./assets/data/rp_survey_data_2019/{demo_name}.csv"
     demo_table = pd.read_csv(path, sep='\t')
     title = demo_table.columns[0]
 
@@ -67,18 +68,15 @@ def get_demo_table(demo_name):
 
     demo_table['x'] = demo_table['label']
     demo_table['y'] = demo_table['Percent']
-    demo_table['text'] = demo_table['Percent'].apply(lambda x: f'{x:.1f}%')
-
-    def hover(row):
-        label = row['label_original']
-        responses = row['Responses']
-        percent = row['Percent']
-        return f'<b>{label}</b><br>{responses} responses ({percent}%)'
-
-    demo_table['hover'] = demo_table.apply(hover, axis=1)
+    demo_table['text'] = hover_text(demo_table, '{Percent:.1f}%')
+    demo_table['hover'] = hover_text(demo_table, '<b>{label_original}</b><br>{Responses} responses ({Percent}%)')
 
     return demo_table
 
+def get_demo_table(demo_name):
+    path = f"./assets/data/rp_survey_data_2019/{demo_name}.csv"
+    return cached_frame(path, lambda: process_demo_table(path))
+
 def get_bar_chart(demo_name):
     demo_table = get_demo_table(demo_name)
     title = demo_table.columns[0]
@@ -5,15 +5,19 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import plotly.express as px
 import pandas as pd
+import numpy as np
 import re
+from itertools import compress
 from glob import glob
 import os
 from utils.subtitle import get_data_source
 from utils.subtitle import get_instructions
+from utils.get_data.open_phil import rollup_grants
+from components.sections.open_phil import get_op_grants_view
+from utils.plots.serialize import figure_json
 
 def get_op_grants():
-    op_grants = pd.read_csv('./assets/data/openphil_grants.csv')
-    # op_grants = pd.read_csv('https://www.openphilanthropy.org/giving/grants/spreadsheet')
+    op_grants = get_op_grants_view(rollup_grants, ('Focus Area', 'Organization Name')).copy()
 
     # Standardize cause area names
     # standard names from https://80000hours.org/topic/causes/
@@ -38,19 +42,14 @@ def get_op_grants():
     #  'Against Malaria Foundation': 'AMF',
     #  'Georgetown University': 'GU',
     }
-    op_grants['Organization'] = op_grants['Organization Name'].map(subs).fillna(op_grants['Organization Name'])
+    # Grants without an organization only count towards their cause area
+    org_names = op_grants['Organization Name'].replace('', np.nan)
+    op_grants['Organization'] = org_names.map(subs).fillna(org_names)
 
     # Standardise Column Names
     op_grants = op_grants[['Organization', 'Cause Area', 'Amount']]
     op_grants['Source'] = 'Open Philanthropy'
 
-    def parse_funding_amount(amount):
-        if type(amount)==str:
-            return int(amount[1:].replace(',', ''))
-        else:
-            return 0
-    op_grants['Amount'] = op_grants['Amount'].apply(parse_funding_amount).astype('int')
-
     return op_grants
 
 
@@ -78,8 +77,12 @@ def get_ea_funds():
     return ea_funds
 
 
-def get_funding_long():
+# Orgs receiving less than this (in $M) from a source in a cause are
+# lumped together as 'Other orgs'
+SANKEY_THRESHOLD = 2*10**1
+# SANKEY_THRESHOLD = 2*10**7
 
+def get_funding():
     funding = pd.concat(
         [
             get_op_grants(),
@@ -88,6 +91,72 @@ def get_funding_long():
         ]
     )
 
+    funding['Amount'] = funding['Amount'] / 1e6
+
+    return funding
+
+# Set from a layout snapshot, in place of reading the grants
+snapshot_funding = None
+
+def load_funding(funding):
+    global snapshot_funding
+    snapshot_funding = funding
+
+def reload_funding():
+    global snapshot_funding
+    snapshot_funding = None
+
+# Rebuilt only when the Open Phil grants change, i.e. once per data version
+funding_totals = None
+funding_totals_source = None
+
+def get_funding_totals():
+    global funding_totals, funding_totals_source
+
+    if snapshot_funding is not None:
+        source = snapshot_funding
+    else:
+        source = get_op_grants_view(rollup_grants, ('Focus Area', 'Organization Name'))
+    if source is funding_totals_source:
+        return funding_totals
+
+    funding = snapshot_funding if snapshot_funding is not None else get_funding()
+
+    cause_totals = funding.groupby(['Source', 'Cause Area'], as_index=False)['Amount'].sum()
+    cause_links = list(zip(
+        cause_totals['Source'],
+        cause_totals['Cause Area'],
+        cause_totals['Amount'],
+        cause_totals['Source'],
+    ))
+
+    # Each (source, cause)'s org totals in ascending order, with their
+    # running sums, so that any threshold splits them with one binary search.
+    # 'Unknowns' count towards 'Other orgs' but never get a link of their own.
+    org_totals = funding.groupby(['Source', 'Cause Area', 'Organization'], as_index=False)['Amount'].sum()
+    org_totals = org_totals.sort_values(by=['Source', 'Cause Area', 'Amount'], kind='stable')
+    org_totals['cumulative'] = org_totals.groupby(['Source', 'Cause Area'])['Amount'].cumsum()
+    org_groups = [
+        (
+            source,
+            cause,
+            orgs['Amount'].to_numpy(),
+            orgs['cumulative'].to_numpy(),
+            [
+                (cause, org, amount, source)
+                for org, amount in zip(orgs['Organization'], orgs['Amount'])
+            ],
+            (orgs['Organization'] != 'Unknowns').to_numpy(),
+        )
+        for (source, cause), orgs in org_totals.groupby(['Source', 'Cause Area'], sort=False)
+    ]
+
+    funding_totals = (cause_links, org_groups)
+    funding_totals_source = source
+    return funding_totals
+
+def get_funding_long(threshold=SANKEY_THRESHOLD):
+
     '''
     Transform table from
       'OpenPhil', 'Global Poverty', 'AMF', 100
@@ -101,67 +170,37 @@ def get_funding_long():
     The last column will be used for coloring the connections.
     '''
 
-    funding['Amount'] = funding['Amount'] / 1e6
+    cause_links, org_groups = get_funding_totals()
 
-    funding_long = pd.DataFrame(columns=['From', 'To', 'Amount', 'Source'])
+    links = [ link for link in cause_links if link[1] != 'Unknowns' ]
+    for source, cause, org_amounts, cumulative, org_links, known in org_groups:
 
-    for source, cause in set(
-        zip(
-            funding['Source'],
-            funding['Cause Area']
-        )
-    ):
-
-        source_cause_df = funding[
-            (funding['Source']==source) & (funding['Cause Area']==cause)
-        ]
-
-        total_funding = source_cause_df['Amount'].sum()
-        funding_long.loc[len(funding_long)] = [
-            source,
-            cause,
-            total_funding,
-            source
-        ]
-
-        other_total = 0
-        for org in source_cause_df['Organization'].unique():
-            org_df = source_cause_df[source_cause_df['Organization']==org]
-            total_funding = org_df['Amount'].sum()
-
-            if total_funding < 2*10**1:
-            # if total_funding < 2*10**7:
-                other_total += total_funding
-                continue
-
-            funding_long.loc[len(funding_long)] = [
-                cause,
-                org,
-                total_funding,
-                source
-            ]
+        # org_amounts[:n_small] are below the threshold
+        n_small = np.searchsorted(org_amounts, threshold)
+        links += compress(org_links[n_small:], known[n_small:])
 
+        other_total = cumulative[n_small-1] if n_small else 0
         if other_total > 0:
-            funding_long.loc[len(funding_long)] = [
-                cause,
-                'Other orgs',
-                other_total,
-                source
-            ]
+            links.append((cause, 'Other orgs', other_total, source))
+
+    return pd.DataFrame(links, columns=['From', 'To', 'Amount', 'Source'])
 
-    funding_long = funding_long[funding_long['To']!='Unknowns']
+def format_millions(amount):
+    if amount >= 1000:
+        return f'${amount/1000:,.1f}B'
+    if amount >= 1:
+        return f'${amount:,.1f}M'
+    return f'${amount*1000:,.0f}K'
 
-    return funding_long
+def threshold_label(threshold):
+    return f'Group organizations receiving less than {format_millions(threshold)} from a source for a cause as "Other orgs"'
 
-def funding_fig():
+def funding_fig(threshold=SANKEY_THRESHOLD):
 
-    funding_long = get_funding_long()
+    funding_long = get_funding_long(threshold)
 
     # Get a list of all funding-related entities
-    entities = set()
-    for col in ['From', 'To']:
-        entities.update(funding_long[col])
-    entities = list(entities)
+    entities = list(pd.unique(pd.concat([funding_long['From'], funding_long['To']])))
 
     # Convert financial inputs and outputs into indices
     entity2idx = {x: i for i,x in enumerate(entities)}
@@ -216,11 +255,37 @@ def donations_sankey_section():
                 hover='rectangles or lines',
                 extra_text = 'Rectangles can be rearranged by dragging.',
             ),
+            html.Div(
+                [
+                    html.Label(
+                        threshold_label(SANKEY_THRESHOLD),
+                        id='sankey-threshold-label',
+                        htmlFor='sankey-threshold',
+                    ),
+                    # log10 of the threshold in $M
+                    dcc.Slider(
+                        id='sankey-threshold',
+                        min=-1,
+                        max=3,
+                        step=0.01,
+                        value=float(np.log10(SANKEY_THRESHOLD)),
+                        marks={
+                            -1: '$100K',
+                            0: '$1M',
+                            1: '$10M',
+                            2: '$100M',
+                            3: '$1B',
+                        },
+                        updatemode='drag',
+                    ),
+                ],
+                className = 'sankey-threshold',
+            ),
             html.Div(
                 html.Div(
                     dcc.Graph(
                         id='Donations',
-                        figure=funding_fig(),
+                        figure=figure_json(funding_fig()),
                         responsive=True,
                     ),
                     className = 'plot-container',
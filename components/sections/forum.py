@@ -9,86 +9,76 @@ from math import log
 from utils.subtitle import get_data_source
 from utils.subtitle import get_instructions
 import json
+from utils.data_cache import cached_frame
+from utils.hover import hover_text
 
 from utils.plots.bar import Bar
 from utils.plots.line import Line
 from utils.plots.scatter import Scatter
 from utils.plots.wilkinson import Wilkinson
 
-posts_df = None
-def get_forum_data():
-    global posts_df
-    if type(posts_df) != type(None):
-        return posts_df
+FORUM_DATA_PATH = './assets/data/ea_forum.json'
 
-    with open('./assets/data/ea_forum.json', 'r') as forum_file:
-        forum_json = json.loads(forum_file.read())
+POST_HOVER = '<b>{title}</b><br>{authors}<br>Posted {posted_at:%d %b %Y}<br>{karma} karma, {comments} comments'
 
-    posts = forum_json['data']['posts']['results']
+AUTHOR_HOVER = '<b>{author}</b><br>First posted: {posted_at:%d %b %Y}<br>Total karma: {karma:,}<br>Total wordcount: {wordcount:,}'
 
-    posts_df = pd.DataFrame(
-        columns=['title', 'posted_at', 'authors', 'url', 'wordcount', 'karma', 'comments']
-    )
+def read_posts(path=FORUM_DATA_PATH):
+
+    with open(path, 'r') as forum_file:
+        posts = json.load(forum_file)['data']['posts']['results']
+
+    # remove very low karma posts before building any columns
+    posts = [ post for post in posts if post['baseScore'] > -20 ]
 
-    for post in posts:
-
-        author_list = []
-        try:
-            author_list.append( post['user']['displayName'] )
-        except:
-            author_list.append('anonymous')
-        for coauthor in post['coauthors']:
-            author_list.append( coauthor['displayName'] )
-        author_string = ', '.join(author_list)
-
-        comment_count = post['commentCount']
-        # resolve nulls to zero
-        comment_count = comment_count if comment_count else 0
-
-        wordcount = post['wordCount']
-        # resolve nulls to zero
-        wordcount = wordcount if wordcount else 0
-
-        posts_df.loc[len(posts_df), :] = [
-            post['title'],
-            post['postedAt'],
-            author_string,
-            post['pageUrl'],
-            wordcount,
-            post['baseScore'],
-            comment_count,
-        ]
-
-    # remove very low karma posts
-    posts_df = posts_df.loc[ posts_df['karma'] > -20 ]
-
-    posts_df['posted_at'] = pd.to_datetime(posts_df['posted_at'])#, format='%m/%Y')
+    def author_string(post):
+        user = post['user']
+        author_list = [ user['displayName'] if user else 'anonymous' ]
+        author_list += [ coauthor['displayName'] for coauthor in post['coauthors'] ]
+        return ', '.join(author_list)
+
+    # Build the frame column by column in a single pass over the posts.
+    # Null word and comment counts resolve to zero.
+    return pd.DataFrame({
+        'title': [ post['title'] for post in posts ],
+        'posted_at': [ post['postedAt'] for post in posts ],
+        'authors': [ author_string(post) for post in posts ],
+        'url': [ post['pageUrl'] for post in posts ],
+        'wordcount': np.array([ post['wordCount'] or 0 for post in posts ], dtype='int64'),
+        'karma': np.array([ post['baseScore'] for post in posts ], dtype='int64'),
+        'comments': np.array([ post['commentCount'] or 0 for post in posts ], dtype='int64'),
+    })
+
+def process_posts():
+
+    posts_df = read_posts()
+
+    # postedAt is always ISO 8601, which pandas parses without guessing
+    posts_df['posted_at'] = pd.to_datetime(posts_df['posted_at'], format='ISO8601')
     posts_df = posts_df.sort_values(by='posted_at', ascending=False)
     posts_df['posted_at_readable'] = posts_df['posted_at'].dt.strftime('%d %b %Y')
     posts_df['size'] = posts_df['wordcount'] + 1
 
     # hovertext
-    def hover(row):
-
-        title = row['title']
-        posted_at = row['posted_at_readable']
-        authors = row['authors']
-        wordcount = row['wordcount']
-        karma = row['karma']
-        comments = row['comments']
+    posts_df['hover'] = hover_text(posts_df, POST_HOVER)
 
-        result = ''
-        result += f"<b>{title}</b>"
-        result += f"<br>{authors}"
-        result += f"<br>Posted {posted_at}"
-        result += f"<br>{karma} karma, {comments} comments"
+    return posts_df
 
-        return result
+posts_df = None
+def get_forum_data():
+    global posts_df
+    if type(posts_df) != type(None):
+        return posts_df
 
-    posts_df['hover'] = posts_df.apply(hover, axis=1)
+    posts_df = cached_frame(FORUM_DATA_PATH, process_posts)
 
     return posts_df
 
+def reload_forum_data():
+    global posts_df
+    posts_df = None
+    return get_forum_data()
+
 
 def forum_scatter(forum_df):
 
@@ -99,7 +89,7 @@ def forum_scatter(forum_df):
         x_title = "Date Posted",
         y_title = "Karma",
         title = "All EA Forum Posts",
-        hover = 'hover',
+        hover_template = POST_HOVER,
     )
 
 def forum_scatter_section():
@@ -128,135 +118,75 @@ def forum_scatter_section():
         id='forum-scatter-section',
     )
 
-def post_counts(forum_df):
+def truncate_names(names, max_length=50):
+    return names.where(names.str.len() <= max_length, names.str[:max_length] + '...')
+
+def hover_list(names, groups, max_displayed=10):
+    # '<br>name' for the first max_displayed names of each group, then '<br>...'
+    rank = names.groupby(groups).cumcount()
+    shown = ('<br>' + truncate_names(names))[rank < max_displayed]
+    result = shown.groupby(groups[rank < max_displayed]).sum()
+    more = names.groupby(groups).size() > max_displayed
+    return result.where(~more, result + '<br>...')
 
+def post_counts(forum_df):
 
     forum_df = forum_df.sort_values(by='posted_at')
+    days = forum_df['posted_at'].dt.date.rename('posted_at')
 
-    forum_df['Unit'] = 1
-    forum_df['Count'] = forum_df['Unit'].cumsum()
-    forum_df['posted_at'] = forum_df['posted_at'].dt.date
-    forum_df['cumulative_word_count'] = forum_df['wordcount'].cumsum()
-
-    authors = set()
-    def new_authors(author_string):
-        author_list = author_string.split(',')
-        author_list = [ author.strip() for author in author_list ]
-        new_authors = []
-        for author in author_list:
-            if author not in authors:
-                new_authors.append(author)
-                authors.add(author)
-        return new_authors
-
-    forum_df['new_authors'] = forum_df['authors'].apply(new_authors)
-    forum_df['new_author_count'] = forum_df['new_authors'].apply(len)
-    forum_df['author_count'] = forum_df['new_author_count'].cumsum()
-
-    posted_at_groups = forum_df.groupby('posted_at')
-    forum_by_day_df = pd.DataFrame({
-        'posted_at': forum_df['posted_at'].unique(),
-        'posted_at_readable': forum_df['posted_at_readable'].unique(),
-    })
+    # Each author's first appearance, in posting order
+    authors = forum_df['authors'].str.split(',').explode().str.strip()
+    new_authors = authors[~authors.duplicated()]
+    new_author_days = days.loc[new_authors.index]
 
-    # new posts
+    forum_by_day_df = forum_df.groupby(days).agg(
+        posted_at_readable=('posted_at_readable', 'first'),
+        new_posts=('title', 'size'),
+        new_words=('wordcount', 'sum'),
+    )
+    forum_by_day_df['total_posts'] = forum_by_day_df['new_posts'].cumsum()
+    forum_by_day_df['new_author_count'] = new_authors.groupby(new_author_days).size()
+    forum_by_day_df['new_author_count'] = forum_by_day_df['new_author_count'].fillna(0).astype('int64')
+    forum_by_day_df['author_count'] = forum_by_day_df['new_author_count'].cumsum()
+    forum_by_day_df['total_words'] = forum_by_day_df['new_words'].cumsum()
 
-    forum_by_day_df['titles'] = posted_at_groups['title'].apply(list).tolist()
-    forum_by_day_df['new_posts'] = posted_at_groups['Unit'].sum().tolist()
-    forum_by_day_df['total_posts'] = posted_at_groups['Count'].last().tolist()
+    forum_by_day_df['title_list'] = hover_list(forum_df['title'], days)
+    forum_by_day_df['new_author_list'] = hover_list(new_authors, new_author_days)
+    forum_by_day_df['new_author_list'] = forum_by_day_df['new_author_list'].fillna('')
+    forum_by_day_df = forum_by_day_df.reset_index()
 
-    label = forum_df['Count'].tolist()[-1]
+    # new posts
+
+    label = forum_by_day_df['total_posts'].tolist()[-1]
     label = f'{label:,} Posts'
     forum_by_day_df['new_posts_label'] = label
 
-    def new_posts_hover(row):
-
-        new_posts = row['new_posts']
-        total_posts = row['total_posts']
-        posted_at = row['posted_at_readable']
-        titles = row['titles']
-
-        max_displayed_titles = 10
-        if len(titles) > max_displayed_titles:
-            titles = titles[:max_displayed_titles] + ['...']
-
-        result = ''
-        result += f"<b>{posted_at}</b>"
-        result += f"<br><b>{new_posts} new posts ({total_posts:,} total):</b>"
-        for title in titles:
-
-            max_title_length = 50
-            if len(title) > max_title_length:
-                title = title[:max_title_length] + '...'
-            result += f"<br>{title}"
-
-        return result
-
-    forum_by_day_df['new_posts_hover'] = forum_by_day_df.apply(new_posts_hover, axis=1)
-
+    forum_by_day_df['new_posts_hover'] = hover_text(
+        forum_by_day_df,
+        '<b>{posted_at_readable}</b><br><b>{new_posts} new posts ({total_posts:,} total):</b>{title_list}',
+    )
 
     # new authors
 
-    forum_by_day_df['new_authors'] = posted_at_groups['new_authors'].sum().tolist()
-    forum_by_day_df['new_author_count'] = posted_at_groups['new_author_count'].sum().tolist()
-    forum_by_day_df['author_count'] = posted_at_groups['author_count'].last().tolist()
-
-    label = forum_df['author_count'].tolist()[-1]
+    label = forum_by_day_df['author_count'].tolist()[-1]
     label = f'{label:,} Unique Authors'
     forum_by_day_df['new_authors_label'] = label
 
-    def new_authors_hover(row):
-
-        new_authors = row['new_authors']
-        new_authors_count = row['new_author_count']
-        total_authors = row['author_count']
-        posted_at = row['posted_at_readable']
-
-        max_displayed_authors = 10
-        if len(new_authors) > max_displayed_authors:
-            new_authors = new_authors[:max_displayed_authors] + ['...']
-
-        result = ''
-        result += f"<b>{posted_at}</b>"
-        result += f"<br><b>{new_authors_count} new authors ({total_authors:,} total):</b>"
-        for author in new_authors:
-
-            max_author_length = 50
-            if len(author) > max_author_length:
-                author = author[:max_author_length] + '...'
-            result += f"<br>{author}"
-
-        return result
-
-    forum_by_day_df['new_authors_hover'] = forum_by_day_df.apply(new_authors_hover, axis=1)
-
+    forum_by_day_df['new_authors_hover'] = hover_text(
+        forum_by_day_df,
+        '<b>{posted_at_readable}</b><br><b>{new_author_count} new authors ({author_count:,} total):</b>{new_author_list}',
+    )
 
     # word count
 
-
-    forum_by_day_df['new_words'] = posted_at_groups['wordcount'].sum().tolist()
-    forum_by_day_df['total_words'] = posted_at_groups['cumulative_word_count'].last().tolist()
-
     label = forum_by_day_df['total_words'].tolist()[-1]
     label = f'{label:,} Words'
     forum_by_day_df['word_count_label'] = label
 
-    def word_count_hover(row):
-
-        new_words = row['new_words']
-        total_words = row['total_words']
-        posted_at = row['posted_at_readable']
-
-        result = ''
-        result += f"<b>{posted_at}</b>"
-        result += f"<br>{total_words:,} total words"
-        result += f"<br>{new_words:,} new words"
-
-        return result
-
-    forum_by_day_df['word_count_hover'] = forum_by_day_df.apply(word_count_hover, axis=1)
-
-
+    forum_by_day_df['word_count_hover'] = hover_text(
+        forum_by_day_df,
+        '<b>{posted_at_readable}</b><br>{total_words:,} total words<br>{new_words:,} new words',
+    )
 
     # New posts line plot
 
@@ -349,29 +279,30 @@ def forum_post_wilkinson_section():
 
     forum_df = get_forum_data()
 
+    # Stable sorts, so that dots with equal values stack in a fixed order
     karma_graph = Wilkinson(
-        forum_df.sort_values('karma'),
+        forum_df.sort_values('karma', kind='stable'),
         value='karma',
         text='title',
         title='Posts by Karma',
         y_title='Karma',
-        hover='hover',
+        hover_template=POST_HOVER,
     )
     length_graph = Wilkinson(
-        forum_df.sort_values('wordcount'),
+        forum_df.sort_values('wordcount', kind='stable'),
         value='wordcount',
         text='title',
         title='Posts by Wordcount',
         y_title='Words',
-        hover='hover',
+        hover_template=POST_HOVER,
     )
     date_graph = Wilkinson(
-        forum_df.sort_values('posted_at'),
+        forum_df.sort_values('posted_at', kind='stable'),
         value='posted_at',
         text='title',
         title='Posts by Date Posted',
         y_title='Date Posted',
-        hover='hover',
+        hover_template=POST_HOVER,
     )
 
     return html.Div(
@@ -408,8 +339,8 @@ def forum_user_wilkinson_section():
 
     forum_df = get_forum_data()
 
-    # Only consider first author
-    forum_df['first_author'] = forum_df['authors'].apply(lambda x: x.split(',')[0].strip())
+    # Only consider first author. The shared frame is left as it is.
+    forum_df = forum_df.assign(first_author=forum_df['authors'].str.split(',').str[0].str.strip())
     forum_df = forum_df.sort_values(['first_author', 'posted_at'])
 
     author_groups = forum_df.groupby('first_author')
@@ -419,50 +350,33 @@ def forum_user_wilkinson_section():
     author_df['karma'] = author_groups['karma'].sum().tolist()
     author_df['wordcount'] = author_groups['wordcount'].sum().tolist()
     author_df['posted_at'] = author_groups['posted_at'].first().tolist()
-    author_df['posted_at_readable'] = author_groups['posted_at_readable'].first().tolist()
-
-    def hover(row):
-
-        author = row['author']
-        posted_at = row['posted_at_readable']
-        wordcount = row['wordcount']
-        karma = row['karma']
-
-        result = ''
-        result += f"<b>{author}</b>"
-        result += f"<br>First posted: {posted_at}"
-        result += f"<br>Total karma: {karma:,}"
-        result += f"<br>Total wordcount: {wordcount:,}"
-
-        return result
 
-    author_df['hover'] = author_df.apply(hover, axis=1)
 
     karma_graph = Wilkinson(
-        author_df.sort_values('karma'),
+        author_df.sort_values('karma', kind='stable'),
         value='karma',
         text='author',
         title='Authors by Total Karma',
         y_title='Karma',
-        hover='hover',
+        hover_template=AUTHOR_HOVER,
         bins=30,
     )
     length_graph = Wilkinson(
-        author_df.sort_values('wordcount'),
+        author_df.sort_values('wordcount', kind='stable'),
         value='wordcount',
         text='author',
         title='Authors by Total Wordcount',
         y_title='Words',
-        hover='hover',
+        hover_template=AUTHOR_HOVER,
         bins=30,
     )
     date_graph = Wilkinson(
-        author_df.sort_values('posted_at'),
+        author_df.sort_values('posted_at', kind='stable'),
         value='posted_at',
         text='author',
         title='Authors by Date of First Post',
         y_title='Date Posted',
-        hover='hover',
+        hover_template=AUTHOR_HOVER,
     )
 
     return html.Div(
@@ -8,6 +8,8 @@ from countryinfo import CountryInfo
 from math import log
 from utils.subtitle import get_data_source
 from utils.subtitle import get_instructions
+from utils.hover import hover_text
+from utils.plots.serialize import figure_json
 
 ##################################
 ###         WORLD MAP          ###
@@ -15,19 +17,9 @@ from utils.subtitle import get_instructions
 
 # source: https://plotly.com/python/bubble-maps/
 
-country = CountryInfo()
-country_list = country.all().keys()
-
-countries = pd.read_csv('./assets/data/rp_survey_data_2019/country2.csv')
-
-countries['Responses'] = countries['Responses'].astype('int')
-
-countries.loc[countries['Country']=='United States of America', 'Country'] = 'United States'
-
-MINIMUM_CIRCLE_SIZE = 0 # 20
-countries['circle size'] = countries['Responses'] + MINIMUM_CIRCLE_SIZE
+MINIMUM_CIRCLE_SIZE = 15
 
-countries = countries.sort_values('Responses', ascending=True)
+COUNTRY_HOVER = '<b>{Country}</b><br>{Responses:,.0f} survey responses<br>{Density (per million):.2f} per million people'
 
 def get_population(country):
     try:
@@ -35,119 +27,145 @@ def get_population(country):
     except:
         return 1e9
 
-countries['population'] = countries['Country'].apply(get_population)
-countries['Density (per million)'] = countries['Responses'] / countries['population'] * 1e6
-countries['Density (per million)'] = countries['Density (per million)'].apply(lambda x: round(x, 2))
-countries['log density'] = countries['Density (per million)'].apply(lambda x: 1 + log(x+1))
-MINIMUM_CIRCLE_SIZE = 15
-countries['circle size'] = countries['Responses'] + MINIMUM_CIRCLE_SIZE
+def process_countries():
+
+    countries = pd.read_csv('./assets/data/rp_survey_data_2019/country2.csv')
+
+    countries['Responses'] = countries['Responses'].astype('int')
+
+    countries.loc[countries['Country']=='United States of America', 'Country'] = 'United States'
 
-def hover(row):
-    country = row['Country']
-    responses = row['Responses']
-    density = row['Density (per million)']
-    return f'<b>{country}</b><br>{responses:,.0f} survey responses<br>{density:.2f} per million people'
-countries['hover'] = countries.apply(hover, axis=1)
+    countries = countries.sort_values('Responses', ascending=True)
 
-countries_for_map = countries.copy()
-countries_for_map.loc[len(countries_for_map), ['Country', 'Responses', 'Density (per million)', 'log density']] = ('Antarctica', 0, 0, 0)
+    countries['population'] = countries['Country'].apply(get_population)
+    countries['Density (per million)'] = countries['Responses'] / countries['population'] * 1e6
+    countries['Density (per million)'] = countries['Density (per million)'].apply(lambda x: round(x, 2))
+    countries['log density'] = countries['Density (per million)'].apply(lambda x: 1 + log(x+1))
+    countries['circle size'] = countries['Responses'] + MINIMUM_CIRCLE_SIZE
 
-countries_for_map['hover'] = countries_for_map.apply(hover, axis=1)
+    countries['hover'] = hover_text(countries, COUNTRY_HOVER)
+
+    return countries
+
+# Built on first use rather than on import, so workers that load a layout
+# snapshot never read the survey or look up populations
+countries_df = None
+def get_countries():
+    global countries_df
+    if type(countries_df) == type(None):
+        countries_df = process_countries()
+    return countries_df
 
 # Population map
 
-pop_map = px.scatter_geo(
-    countries,
-    locations="Country",
-    hover_name="Country",
-    locationmode='country names',
-    size="circle size",
-    title="Number of EAs by Country",
-    hover_data = {
-        'circle size': False,
-        'Responses': True,
-        'Country': False,
-        'log density': False,
-        'Density (per million)': True,
-    },
-    projection="equirectangular", # 'orthographic' is fun
-)
-
-pop_map.update_layout(
-    margin=dict(l=0, r=0, t=80, b=0),
-    title_x=0.5,
-)
-
-pop_map.update_traces(
-    marker = dict(
-        color ="#36859A",
-    ),
-    hovertext = countries['hover'],
-    hovertemplate = '%{hovertext}<extra></extra>',
-)
-
-pop_map.update_geos(
-    showcoastlines=False,
-    landcolor="#dfe3ee",
-)
+def population_map(countries):
+
+    pop_map = px.scatter_geo(
+        countries,
+        locations="Country",
+        hover_name="Country",
+        locationmode='country names',
+        size="circle size",
+        title="Number of EAs by Country",
+        hover_data = {
+            'circle size': False,
+            'Responses': True,
+            'Country': False,
+            'log density': False,
+            'Density (per million)': True,
+        },
+        projection="equirectangular", # 'orthographic' is fun
+    )
+
+    pop_map.update_layout(
+        margin=dict(l=0, r=0, t=80, b=0),
+        title_x=0.5,
+    )
+
+    pop_map.update_traces(
+        marker = dict(
+            color ="#36859A",
+        ),
+        hovertext = countries['hover'],
+        hovertemplate = '%{hovertext}<extra></extra>',
+    )
+
+    pop_map.update_geos(
+        showcoastlines=False,
+        landcolor="#dfe3ee",
+    )
+
+    return pop_map
 
 # Density map
 
-density_map = px.choropleth(
-    countries_for_map,
-    locations="Country",
-    hover_name="Country",
-    locationmode='country names',
-    color='log density',
-    title="EAs Per Capita (Darker/Greener is Higher)",
-    color_continuous_scale=["#dfe3ee", "#007a8f"],
-    hover_data = {
-        'circle size': False,
-        'Responses': True,
-        'Country': False,
-        'log density': False,
-        'Density (per million)': True,
-    },
-    projection="equirectangular", # 'orthographic' is fun. "natural earth" is quite nice
-)
-
-density_map.update_layout(
-    margin=dict(l=0, r=0, t=80, b=0),
-    coloraxis_showscale=False,
-    title_x=0.5,
-)
-
-density_map.update_traces(
-    hovertext = countries_for_map['hover'],
-    hovertemplate = '%{hovertext}<extra></extra>',
-    marker_line_width=0,
-)
-
-density_map.update_geos(
-    showcoastlines=False,
-    landcolor="#dfe3ee",
-)
-
-countries['x'] = countries['Country']
-countries['text'] = countries['Responses'].apply(lambda x: f'{x:}')
-countries['y'] = countries['Responses']
-countries_truncated = countries.iloc[len(countries)*2//3:]
-
-countries_bar = Bar(
-    countries_truncated,
-    title = f'Countries with Most EAs',
-)
-
-countries_capita_sort = countries.sort_values(by='Density (per million)')
-countries_capita_sort['x'] = countries_capita_sort['Country']
-countries_capita_sort['y'] = countries_capita_sort['Density (per million)']
-countries_capita_sort['text'] = countries_capita_sort['Density (per million)'].apply(lambda x: f'{x:.1f}')
-countries_capita_sort_truncated = countries_capita_sort.iloc[len(countries)*2//3:]
-
-per_capita_bar = Bar(
-    countries_capita_sort_truncated,
-    title = f'Top EAs per Capita (×1M)',
-)
+def density_map(countries):
+
+    countries_for_map = countries.copy()
+    countries_for_map.loc[len(countries_for_map), ['Country', 'Responses', 'Density (per million)', 'log density']] = ('Antarctica', 0, 0, 0)
+
+    countries_for_map['hover'] = hover_text(countries_for_map, COUNTRY_HOVER)
+
+    density_map = px.choropleth(
+        countries_for_map,
+        locations="Country",
+        hover_name="Country",
+        locationmode='country names',
+        color='log density',
+        title="EAs Per Capita (Darker/Greener is Higher)",
+        color_continuous_scale=["#dfe3ee", "#007a8f"],
+        hover_data = {
+            'circle size': False,
+            'Responses': True,
+            'Country': False,
+            'log density': False,
+            'Density (per million)': True,
+        },
+        projection="equirectangular", # 'orthographic' is fun. "natural earth" is quite nice
+    )
+
+    density_map.update_layout(
+        margin=dict(l=0, r=0, t=80, b=0),
+        coloraxis_showscale=False,
+        title_x=0.5,
+    )
+
+    density_map.update_traces(
+        hovertext = countries_for_map['hover'],
+        hovertemplate = '%{hovertext}<extra></extra>',
+        marker_line_width=0,
+    )
+
+    density_map.update_geos(
+        showcoastlines=False,
+        landcolor="#dfe3ee",
+    )
+
+    return density_map
+
+def countries_bar(countries):
+    countries = countries.copy()
+    countries['x'] = countries['Country']
+    countries['text'] = hover_text(countries, '{Responses}')
+    countries['y'] = countries['Responses']
+    countries_truncated = countries.iloc[len(countries)*2//3:]
+
+    return Bar(
+        countries_truncated,
+        title = f'Countries with Most EAs',
+    )
+
+def per_capita_bar(countries):
+    countries_capita_sort = countries.sort_values(by='Density (per million)')
+    countries_capita_sort['x'] = countries_capita_sort['Country']
+    countries_capita_sort['y'] = countries_capita_sort['Density (per million)']
+    countries_capita_sort['text'] = hover_text(countries_capita_sort, '{Density (per million):.1f}')
+    countries_capita_sort_truncated = countries_capita_sort.iloc[len(countries)*2//3:]
+
+    return Bar(
+        countries_capita_sort_truncated,
+        title = f'Top EAs per Capita (×1M)',
+    )
 
 def country_total_section():
     return html.Div(
@@ -163,13 +181,13 @@ def country_total_section():
                         html.Div(
                             dcc.Graph(
                                 id='pop_map',
-                                figure=pop_map,
+                                figure=figure_json(population_map(get_countries())),
                                 responsive=True,
                             ),
                             className='plot-container'
                         ),
                         html.Div(
-                            countries_bar,
+                            countries_bar(get_countries()),
                             className='plot-container',
                         ),
                     ],
@@ -197,13 +215,13 @@ def country_per_capita_section():
                         html.Div(
                             dcc.Graph(
                                 id='density_map',
-                                figure=density_map,
+                                figure=figure_json(density_map(get_countries())),
                                 responsive=True,
                             ),
                             className='plot-container'
                         ),
                         html.Div(
-                            per_capita_bar,
+                            per_capita_bar(get_countries()),
                             className='plot-container'
                         ),
                     ],
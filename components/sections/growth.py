@@ -5,149 +5,138 @@ import numpy as np
 import string
 from dash import dcc
 from dash import html
-from utils.subtitle import get_subtitle
+from utils.subtitle import get_data_source
+from utils.subtitle import get_instructions
 from utils.plots.line import Line
+from utils.hover import hover_text
+
+GROWTH_DATA_PATH = 'assets/data/is_ea_growing/is_ea_growing_{}.csv'
+
+IGNORED_LABELS = [
+    'EA FB “Active Users”',
+    'Vox Future Perfect Newsletter sign-ups',
+
+    'New EA Reddit subscribers',
+    'EA FB membership',
+
+    'Number of 80,000 Hours significant plan changes (not impact adjusted)',
+    'Number of 80,000 Hours significant plan changes (impact adjusted)',
+    'ACE money moved[x]',
+    'TLYCS money moved',
+    'Total OpenPhil non-GiveWell donations',
+    'Total non-OpenPhil donors to GiveWell',
+    '# donors in EA Survey',
+    #'OpenPhil GiveWell donations',
+    #'Non-OpenPhil GiveWell donations',
+    'Total recorded money actually donated (not pledges) from Giving What We Can members',
+    #'# donors in EA Survey',
+    #'Founder’s Pledge pledges',
+    'EA Funds payouts[y]',
+
+    'Google interest in “effective altruism” (relative scoring)',
+]
+
+# Get rid junk in strings
+def field_to_numeric(field):
+    if type(field)!=str:
+        return field
+    field = field.replace('K', '*10**3')
+    field = field.replace('M', '*10**6')
+    valid_chars = '.*' + string.digits
+    field = ''.join([
+        char for char in field if char in valid_chars
+    ])
+    return eval(field)
+
+def clean_growth_table(df):
+
+    # Convert column names from 'Jan-Dec 2014' to '2014'
+    df.columns = [
+        col.replace('Jan-Dec ', '') for col in df.columns
+    ]
 
-commiting = pd.read_csv('assets/data/is_ea_growing/is_ea_growing_commiting.csv')
-doing = pd.read_csv('assets/data/is_ea_growing/is_ea_growing_doing.csv')
-joining = pd.read_csv('assets/data/is_ea_growing/is_ea_growing_joining.csv')
-reading = pd.read_csv('assets/data/is_ea_growing/is_ea_growing_reading.csv')
-
-
-# "Founder's Pledge pledges" makes more sense in "doing" than in "commiting"
-doing = doing.append( commiting.loc[ commiting['Type of data']=='Founder’s Pledge pledges' ], ignore_index=True )
-commiting = commiting.loc[ ~(commiting['Type of data']=='Founder’s Pledge pledges') ]
-
-
-
-# Clean tables
-growing_dfs = [commiting, doing, joining, reading]
-for df in growing_dfs:
-
-   # Convert column names from 'Jan-Dec 2014' to '2014'
-   df.columns = [
-      col.replace('Jan-Dec ', '') for col in df.columns
-   ]
-
-   # Replace 'Didn’t exist', 'No data', 'No data yet', 
-   df.replace('No data', np.nan, inplace=True)
-   df.replace('No data yet', np.nan, inplace=True)
-   df.replace('No survey', np.nan, inplace=True)
-   df.replace('Didn’t exist', np.nan, inplace=True)
-
-   # Get rid junk in strings
-   def field_to_numeric(field):
-      if type(field)!=str:
-         return field
-      field = field.replace('K', '*10**3')
-      field = field.replace('M', '*10**6')
-      valid_chars = '.*' + string.digits
-      field = ''.join([
-         char for char in field if char in valid_chars
-      ])
-      return eval(field)
-      return field
-   for col in df.columns:
-      if col == 'Type of data':
-         continue
-      df[col] = df[col].apply(field_to_numeric)
-
-
-
-
-long_dfs = []
-for df in [commiting, doing, joining, reading]:
-   years = df.columns[1:]
-   row_dfs = []
-   for row in range(len(df)):
-      label = df.loc[row, 'Type of data']
-      values = df.loc[row, years]
-      if df is reading:
-         values = values
-      else:
-         values = np.nancumsum(values)
-      row_df = pd.DataFrame({
-         'year': years,
-         'value': values,
-      })
-      row_df['label'] = label#[:30]
-      row_dfs.append(row_df)
-   long_df = pd.concat(row_dfs, ignore_index=True)
-   long_df['year'] = pd.to_datetime(long_df['year'], format='%Y')
-
-   long_dfs.append( long_df )
-
-commiting, doing, joining, reading = long_dfs
-
-growing_figs = []
-for table, table_name in zip(
-    [
-        reading,
-        joining,
-        commiting,
-        doing,
-    ],
-    [
-        '','','',''
-        #'low engaged',
-        #'medium engaged',
-        #'highly engaged',
-        #'money',
+    # Replace 'Didn’t exist', 'No data', 'No data yet',
+    df = df.replace(['No data', 'No data yet', 'No survey', 'Didn’t exist'], np.nan)
+
+    for col in df.columns:
+        if col == 'Type of data':
+            continue
+        df[col] = df[col].apply(field_to_numeric)
+
+    return df
+
+def growth_long(df, cumulative=True):
+    years = df.columns[1:]
+    row_dfs = []
+    for row in range(len(df)):
+        label = df.loc[row, 'Type of data']
+        values = df.loc[row, years]
+        if cumulative:
+            values = np.nancumsum(values)
+        row_df = pd.DataFrame({
+            'year': years,
+            'value': values,
+        })
+        row_df['label'] = label#[:30]
+        row_dfs.append(row_df)
+    long_df = pd.concat(row_dfs, ignore_index=True)
+    long_df['year'] = pd.to_datetime(long_df['year'], format='%Y')
+    return long_df
+
+def process_growth():
+
+    commiting, doing, joining, reading = [
+        pd.read_csv(GROWTH_DATA_PATH.format(name))
+        for name in ['commiting', 'doing', 'joining', 'reading']
     ]
-):
-
-    def hover(row):
-        label =row['label']
-        value = row['value']
-        year = row['year'].year
-        return f'<b>{label}</b><br>{value:,.0f}<br><i>{year}</i>'
-
-    table['hover'] = table.apply(hover, axis=1).tolist()
-
-    ignored_labels = [
-        'EA FB “Active Users”',
-        'Vox Future Perfect Newsletter sign-ups',
-
-        'New EA Reddit subscribers',
-        'EA FB membership',
-
-        'Number of 80,000 Hours significant plan changes (not impact adjusted)',
-        'Number of 80,000 Hours significant plan changes (impact adjusted)',
-        'ACE money moved[x]',
-        'TLYCS money moved',
-        'Total OpenPhil non-GiveWell donations',
-        'Total non-OpenPhil donors to GiveWell',
-        '# donors in EA Survey',
-        #'OpenPhil GiveWell donations',
-        #'Non-OpenPhil GiveWell donations',
-        'Total recorded money actually donated (not pledges) from Giving What We Can members',
-        #'# donors in EA Survey',
-        #'Founder’s Pledge pledges',
-        'EA Funds payouts[y]',
-
-        'Google interest in “effective altruism” (relative scoring)',
+
+    # "Founder's Pledge pledges" makes more sense in "doing" than in "commiting"
+    founders_pledge = commiting['Type of data']=='Founder’s Pledge pledges'
+    doing = pd.concat([doing, commiting.loc[founders_pledge]], ignore_index=True)
+    commiting = commiting.loc[~founders_pledge].reset_index(drop=True)
+
+    commiting, doing, joining, reading = [
+        clean_growth_table(df) for df in [commiting, doing, joining, reading]
+    ]
+
+    # Reading figures are per year, the rest are running totals
+    return [
+        growth_long(reading, cumulative=False),
+        growth_long(joining),
+        growth_long(commiting),
+        growth_long(doing),
     ]
 
-    table = table.loc[ ~table['label'].isin(ignored_labels) ]
-
-    growing_figs.append(
-        html.Div(
-            Line(
-                table,
-                x='year',
-                y='value',
-                label='label',
-                title='',
-                x_title='',
-                y_title='',
-                size=None,
-                color=None,
-                hover='hover',
-                log_y=False,
-            )
+def growth_fig(table):
+
+    table['hover'] = hover_text(table, '<b>{label}</b><br>{value:,.0f}<br><i>{year:%Y}</i>')
+
+    table = table.loc[ ~table['label'].isin(IGNORED_LABELS) ]
+
+    return html.Div(
+        Line(
+            table,
+            x='year',
+            y='value',
+            label='label',
+            title='',
+            x_title='',
+            y_title='',
+            size=None,
+            color=None,
+            hover='hover',
+            log_y=False,
         )
     )
 
+# Built on first use rather than on import
+growing_figs = None
+def get_growing_figs():
+    global growing_figs
+    if growing_figs is None:
+        growing_figs = [ growth_fig(table) for table in process_growth() ]
+    return growing_figs
+
 def growth1():
     return html.Div(
         [
@@ -155,11 +144,12 @@ def growth1():
                 html.H2('Growth in EA Reading'),
                 className='section-heading',
             ),
-            get_subtitle('growth', hover='points', zoom=True),
+            get_instructions(hover='points', zoom=True),
             html.Div(
-                growing_figs[0],
+                get_growing_figs()[0],
                 className = 'section-body',
             ),
+            get_data_source('growth'),
         ],
         className = 'section',
         id='growth-reading',
@@ -172,11 +162,12 @@ def growth2():
                 html.H2('Growth in EA Joining'),
                 className='section-heading',
             ),
-            get_subtitle('growth', hover='points', zoom=True),
+            get_instructions(hover='points', zoom=True),
             html.Div(
-                growing_figs[1],
+                get_growing_figs()[1],
                 className = 'section-body',
             ),
+            get_data_source('growth'),
         ],
         className = 'section',
         id='growth-joining',
@@ -189,11 +180,12 @@ def growth3():
                 html.H2('Growth in EA Committing'),
                 className='section-heading',
             ),
-            get_subtitle('growth', hover='points', zoom=True),
+            get_instructions(hover='points', zoom=True),
             html.Div(
-                growing_figs[2],
+                get_growing_figs()[2],
                 className = 'section-body',
             ),
+            get_data_source('growth'),
         ],
         className = 'section',
         id='growth-committing',
@@ -206,11 +198,12 @@ def growth4():
                 html.H2('Growth in EA Donating'),
                 className='section-heading',
             ),
-            get_subtitle('growth', hover='points', zoom=True),
+            get_instructions(hover='points', zoom=True),
             html.Div(
-                growing_figs[3],
+                get_growing_figs()[3],
                 className = 'section-body',
             ),
+            get_data_source('growth'),
         ],
         className = 'section',
         id='growth-donating',
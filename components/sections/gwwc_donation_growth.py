@@ -5,35 +5,42 @@ from utils.subtitle import get_data_source
 from utils.subtitle import get_instructions
 from utils.plots.line import Line
 from datetime import datetime
+from utils.data_cache import cached_frame
+from utils.hover import hover_text
 
+DONATIONS_BY_YEAR_PATH = './assets/data/gwwc/donations_by_year.json'
 
-def get_num_donors_hover(row):
 
-    year = row['date'].strftime('%Y')
+NUM_DONORS_HOVER = '<b>{date:%Y}</b><br>${amount_normalized:,.2f} donations<br>${amount_normalized_total:,.2f} total donations<br>{num_donors:,} donors'
 
-    result = ''
-    result += f"<b>{year}</b>"
-    result += f"<br>${row.amount_normalized:,.2f} donations"
-    result += f"<br>${row.amount_normalized_total:,.2f} total donations"
-    result += f"<br>{row.num_donors:,} donors"
 
-    return result
+def process_donations_by_year():
 
-
-def get_gwwc_donation_growth_section():
-
-    donations_by_year = pd.read_json('./assets/data/gwwc/donations_by_year.json')
+    donations_by_year = pd.read_json(DONATIONS_BY_YEAR_PATH)
     #donations_by_year = get_donations_by_year()
 
     donations_by_year['date'] = pd.to_datetime(donations_by_year['year'], format='%Y')
     donations_by_year = donations_by_year.sort_values(by='date')
 
-    # Filter out future donations
-    donations_by_year = donations_by_year.loc[ donations_by_year['date'] < datetime.now() ]
-
     donations_by_year['amount_normalized_total'] = donations_by_year['amount_normalized'].cumsum()
 
-    donations_by_year['hover'] = donations_by_year.apply(get_num_donors_hover, axis=1)
+    donations_by_year['hover'] = hover_text(donations_by_year, NUM_DONORS_HOVER)
+
+    return donations_by_year
+
+
+def load_donations_by_year():
+    return cached_frame(DONATIONS_BY_YEAR_PATH, process_donations_by_year)
+
+
+def get_gwwc_donation_growth_section():
+
+    donations_by_year = load_donations_by_year()
+
+    # Filter out future donations. This happens after loading rather than in
+    # process_donations_by_year, so the cached frame doesn't go stale with
+    # the date. Future rows sort last, so the running totals are unaffected.
+    donations_by_year = donations_by_year.loc[ donations_by_year['date'] < datetime.now() ]
 
     donations_by_year['label'] = 'Donations'
 
@@ -4,18 +4,12 @@ from utils.subtitle import get_data_source
 from utils.subtitle import get_instructions
 from utils.plots.bar import Bar
 from utils.get_data.query_gwwc import get_donations_by_org
+from utils.data_cache import cached_frame
+from utils.hover import hover_text
 
-def get_hover(row):
+DONATIONS_BY_ORG_PATH = './assets/data/gwwc/donations_by_org.json'
 
-    amount = row['Amount (USD)']
-
-    result = ''
-    result += f"<b>{row.Organisation}</b>"
-    result += f"<br>${amount:,.2f} donated"
-    result += f"<br>{row.Donors} donors"
-    result += f"<br>{row.Donations} donations"
-
-    return result
+ORG_HOVER = '<b>{Organisation}</b><br>${Amount (USD):,.2f} donated<br>{Donors} donors<br>{Donations} donations'
 
 def get_top_orgs_by_amount(donations_by_org):
     donations_by_org = donations_by_org.sort_values(by='Amount (USD)', ascending=False)
@@ -24,8 +18,8 @@ def get_top_orgs_by_amount(donations_by_org):
     donations_by_org = donations_by_org.iloc[::-1]
     donations_by_org['y'] = donations_by_org['Amount (USD)']
     donations_by_org['x'] = donations_by_org['Organisation']
-    donations_by_org['hover'] = donations_by_org.apply(get_hover, axis=1)
-    donations_by_org['text'] = donations_by_org['Amount (USD)'].apply(lambda x: f'${x:,.2f}')
+    donations_by_org['hover'] = hover_text(donations_by_org, ORG_HOVER)
+    donations_by_org['text'] = hover_text(donations_by_org, '${Amount (USD):,.2f}')
     return Bar(donations_by_org, title='Top Organizations by Amount')
 
 def get_top_orgs_by_num_donors(donations_by_org):
@@ -35,14 +29,17 @@ def get_top_orgs_by_num_donors(donations_by_org):
     donations_by_org = donations_by_org.iloc[::-1]
     donations_by_org['y'] = donations_by_org['Donors']
     donations_by_org['x'] = donations_by_org['Organisation']
-    donations_by_org['hover'] = donations_by_org.apply(get_hover, axis=1)
-    donations_by_org['text'] = donations_by_org['Donors'].apply(lambda x: f'{x:,}')
+    donations_by_org['hover'] = hover_text(donations_by_org, ORG_HOVER)
+    donations_by_org['text'] = hover_text(donations_by_org, '{Donors:,}')
     return Bar(donations_by_org, title='Top Organizations by Number of Donors')
 
 
 def get_gwwc_donations_orgs_section():
 
-    donations_by_org = pd.read_json('./assets/data/gwwc/donations_by_org.json')
+    donations_by_org = cached_frame(
+        DONATIONS_BY_ORG_PATH,
+        lambda: pd.read_json(DONATIONS_BY_ORG_PATH),
+    )
     #donations_by_org = get_donations_by_org()
 
     return html.Div(
@@ -4,36 +4,15 @@ from utils.subtitle import get_data_source
 from utils.subtitle import get_instructions
 from utils.plots.line import Line
 from utils.get_data.query_gwwc import get_new_pledges
+from utils.data_cache import cached_frame
+from utils.hover import hover_text
 
+NEW_PLEDGES_PATH = './assets/data/gwwc/new_pledges.json'
 
-def get_the_pledge_hover(row):
 
-    date = row['date'].strftime('%B %Y')
-    new_pledges = row['the_pledge']
-    total_pledges = row['the_pledge_total']
+THE_PLEDGE_HOVER = '<b>GWWC Pledges</b><br><b>{date:%B %Y}</b><br>{the_pledge:,} new pledges<br>{the_pledge_total:,} total pledges'
 
-    result = ''
-    result += f"<b>GWWC Pledges</b>"
-    result += f"<br><b>{date}</b>"
-    result += f"<br>{new_pledges:,} new pledges"
-    result += f"<br>{total_pledges:,} total pledges"
-
-    return result
-
-
-def get_try_giving_hover(row):
-
-    date = row['date'].strftime('%B %Y')
-    new_pledges = row['try_giving']
-    total_pledges = row['try_giving_total']
-
-    result = ''
-    result += f"<b>Trial Pledges</b>"
-    result += f"<br><b>{date}</b>"
-    result += f"<br>{new_pledges:,} new pledges"
-    result += f"<br>{total_pledges:,} total pledges"
-
-    return result
+TRY_GIVING_HOVER = '<b>Trial Pledges</b><br><b>{date:%B %Y}</b><br>{try_giving:,} new pledges<br>{try_giving_total:,} total pledges'
 
 
 def get_new_pledges_long(new_pledges):
@@ -87,9 +66,9 @@ def get_total_pledges_long(new_pledges):
     return pd.concat([total_pledges_long, total_try_giving_long], ignore_index=True)
 
 
-def get_gwwc_pledges_section():
+def process_new_pledges():
 
-    new_pledges = pd.read_json('./assets/data/gwwc/new_pledges.json')
+    new_pledges = pd.read_json(NEW_PLEDGES_PATH)
     #new_pledges = get_new_pledges()
 
     new_pledges['date'] = pd.to_datetime(new_pledges['pledge_month'])
@@ -97,8 +76,19 @@ def get_gwwc_pledges_section():
     new_pledges['the_pledge_total'] = new_pledges['the_pledge'].cumsum()
     new_pledges['try_giving_total'] = new_pledges['try_giving'].cumsum()
 
-    new_pledges['the_pledge_hover'] = new_pledges.apply(get_the_pledge_hover, axis=1)
-    new_pledges['try_giving_hover'] = new_pledges.apply(get_try_giving_hover, axis=1)
+    new_pledges['the_pledge_hover'] = hover_text(new_pledges, THE_PLEDGE_HOVER)
+    new_pledges['try_giving_hover'] = hover_text(new_pledges, TRY_GIVING_HOVER)
+
+    return new_pledges
+
+
+def load_new_pledges():
+    return cached_frame(NEW_PLEDGES_PATH, process_new_pledges)
+
+
+def get_gwwc_pledges_section():
+
+    new_pledges = load_new_pledges()
 
     new_pledges_long = get_new_pledges_long(new_pledges)
     new_trial_pledges_long = get_new_trial_pledges_long(new_pledges)
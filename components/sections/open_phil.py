@@ -1,7 +1,5 @@
-import plotly.express as px
 import pandas as pd
 from pandas.tseries.offsets import MonthEnd
-import numpy as np
 from dash import dcc
 from dash import html
 from dash import dash_table
@@ -10,71 +8,113 @@ from utils.subtitle import get_instructions
 from utils.subtitle import get_data_source
 from utils.plots.scatter import Scatter
 from utils.plots.line import Line
-import requests
-from io import StringIO
-from utils.get_data.open_phil import download_grants, process_grants, save_grants
+import os
+import threading
+from utils.get_data.open_phil import process_grants, save_grants, OP_GRANTS_PATH
+from utils.get_data.open_phil import build_grants_cube, group_by_org, group_by_focus_area, monthly_totals
+from utils.data_cache import cached_frame
+from utils.hover import hover_text
+
+def load_op_grants():
+    return cached_frame(
+        OP_GRANTS_PATH,
+        lambda: process_grants(pd.read_csv(OP_GRANTS_PATH)),
+    )
 
 op_grants = None
+op_grants_refresh_lock = threading.Lock()
+
+def refresh_op_grants():
+    global op_grants
+
+    # Only for a first boot with no snapshot at all. One download at a time
+    # per process; other callers wait for it and use its result.
+    with op_grants_refresh_lock:
+        if op_grants is not None:
+            return
+        try:
+            # save_grants only replaces the snapshot if the download validates
+            if save_grants():
+                fresh_grants = load_op_grants()
+                if fresh_grants is not None:
+                    op_grants = fresh_grants
+        except Exception as e:
+            print(f"Error refreshing Open Philanthropy data: {e}")
+
 def get_op_grants():
     global op_grants
     if type(op_grants) != type(None):
         return op_grants
 
     try:
-        # Try to get fresh data from the API and save it
-        if save_grants():  # This will download, save, and return True if successful
-            op_grants = pd.read_csv('./assets/data/openphil_grants.csv')
-            op_grants = process_grants(op_grants)
-            if op_grants is not None:
-                return op_grants
-
-        # Fallback to local file if API fails
-        print("Falling back to local file...")
-        op_grants = pd.read_csv('./assets/data/openphil_grants.csv')
-        op_grants = process_grants(op_grants)
-        
+        # Without a local snapshot there's nothing to serve, so wait for the download
+        if not os.path.exists(OP_GRANTS_PATH):
+            refresh_op_grants()
+            return op_grants
+
+        # Newer grants are fetched by the open_phil refresh source, which
+        # the serving processes' scheduler runs under the refresh lock on
+        # boot and hourly, bumping the data version
+        op_grants = load_op_grants()
+
         return op_grants
     except Exception as e:
         print(f"Error loading Open Philanthropy data: {e}")
         return None
 
-
-def org_bar_chart(op_grants):
-    # Only aggregate numeric columns
-    numeric_cols = op_grants.select_dtypes(include=[np.number]).columns
-    op_orgs = op_grants.groupby(by='Organization Name')[numeric_cols].sum().reset_index()
-    op_orgs = op_orgs.sort_values(by='Amount')
+def reload_op_grants():
+    # Pick up a snapshot written by another process, without revalidating
+    global op_grants
+    fresh_grants = load_op_grants()
+    if fresh_grants is not None:
+        op_grants = fresh_grants
+    return op_grants
+
+# The cube and every view of it are rebuilt only when get_op_grants()
+# returns a different frame, i.e. once per data version.
+op_grants_cube = None
+op_grants_cube_source = None
+op_grants_views = {}
+op_grants_cube_lock = threading.Lock()
+
+def get_op_grants_cube():
+    global op_grants_cube, op_grants_cube_source, op_grants_views
+    op_grants = get_op_grants()
+    with op_grants_cube_lock:
+        if op_grants is not op_grants_cube_source:
+            op_grants_cube = build_grants_cube(op_grants)
+            op_grants_cube_source = op_grants
+            op_grants_views = {}
+        return op_grants_cube
+
+def get_op_grants_view(view, *args):
+    # view(cube, *args), memoized for the current cube. Callers must not
+    # modify the result.
+    cube = get_op_grants_cube()
+    key = (view.__name__,) + args
+    if key not in op_grants_views:
+        op_grants_views[key] = view(cube, *args)
+    return op_grants_views[key]
+
+
+def org_bar_chart(op_orgs):
+    op_orgs = op_orgs.copy()
     op_orgs['x'] = op_orgs['Organization Name']
     op_orgs['y'] = op_orgs['Amount']
-    op_orgs['text'] = op_orgs['Amount'].apply(lambda x: f'${x:,.0f}')
-
-    def hover(row):
-        org = row['Organization Name']
-        amount = row['text']
-        grants = row['grants'] if 'grants' in row else 'N/A'
-        return f'<b>{org}</b><br>{grants} grants<br>{amount} total'
-    op_orgs['hover'] = op_orgs.apply(hover, axis=1)
+    op_orgs['text'] = hover_text(op_orgs, '${Amount:,.0f}')
+    op_orgs['hover'] = hover_text(op_orgs, '<b>{Organization Name}</b><br>{grants} grants<br>{text} total')
 
     op_orgs_truncated = op_orgs.reset_index().iloc[:20]
 
     return Bar(op_orgs_truncated, title='Top 20 Donee Organizations')
 
 
-def cause_bar_chart(op_grants):
-    # Only aggregate numeric columns
-    numeric_cols = op_grants.select_dtypes(include=[np.number]).columns
-    op_causes = op_grants.groupby(by='Focus Area')[numeric_cols].sum().reset_index()
-    op_causes = op_causes.sort_values(by='Amount')
+def cause_bar_chart(op_causes):
+    op_causes = op_causes.copy()
     op_causes['x'] = op_causes['Focus Area']
     op_causes['y'] = op_causes['Amount']
-    op_causes['text'] = op_causes['Amount'].apply(lambda x: f'${x:,.0f}')
-
-    def hover(row):
-        area = row['Focus Area']
-        amount = row['text']
-        grants = row['grants'] if 'grants' in row else 'N/A'
-        return f'<b>{area}</b><br>{grants} grants<br>{amount} total'
-    op_causes['hover'] = op_causes.apply(hover, axis=1)
+    op_causes['text'] = hover_text(op_causes, '${Amount:,.0f}')
+    op_causes['hover'] = hover_text(op_causes, '<b>{Focus Area}</b><br>{grants} grants<br>{text} total')
 
     height_per_bar = 25 if len(op_causes) > 10 else 28
     height = height_per_bar * len(op_causes) + 20
@@ -123,8 +163,6 @@ def openphil_grants_scatter_section():
 
 def openphil_grants_categories_section():
 
-    op_grants = get_op_grants()
-
     return html.Div(
         [
             html.Div(
@@ -136,11 +174,11 @@ def openphil_grants_categories_section():
                 html.Div(
                     [
                         html.Div(
-                            cause_bar_chart(op_grants),
+                            cause_bar_chart(get_op_grants_view(group_by_focus_area)),
                             className='plot-container',
                         ),
                         html.Div(
-                            org_bar_chart(op_grants),
+                            org_bar_chart(get_op_grants_view(group_by_org)),
                             className='plot-container',
                         ),
                     ],
@@ -154,53 +192,17 @@ def openphil_grants_categories_section():
         id='op-grants-categories',
     )
 
-def group_by_month(op_grants):
-
-    # Round the dates to the end of the month
-    op_grants['Date'] += MonthEnd(1)
-
-    # Generate a date range up to the present
-    min_date = op_grants['Date'].min()
-    max_date = op_grants['Date'].max()
-    dates = pd.date_range(start=min_date, end=max_date, freq='M')
-
-    grants_by_month = pd.DataFrame(columns=[
-        'date',
-        'grants',
-        'focus_areas',
-        'organizations',
-        'total_amount',
-        'n_grants',
-    ])
-
-    for i, date in enumerate(dates):
-        grants_by_month_i = op_grants.loc[ op_grants['Date'] == date ]
-        grants_by_month.loc[i, 'date'] = date
-        grants_by_month.loc[i, 'grants'] = grants_by_month_i['Grant'].tolist()
-        grants_by_month.loc[i, 'focus_areas'] = grants_by_month_i['Focus Area'].tolist()
-        grants_by_month.loc[i, 'organizations'] = grants_by_month_i['Focus Area'].tolist()
-        grants_by_month.loc[i, 'total_amount'] = grants_by_month_i['Amount'].sum()
-        grants_by_month.loc[i, 'n_grants'] = len(grants_by_month_i)
-
-    return grants_by_month
-
-
 def openphil_line_plot_section():
 
     op_grants = get_op_grants()
     op_grants = op_grants.sort_values(by='Date').reset_index()
 
-    def monthly_hover(row):
-        month = row['date'].strftime('%B %Y')
-        result = ''
-        result += f"<b>{month}</b>"
-        result += f"<br>{row.n_grants} grants"
-        result += f"<br>${row.total_amount:,.2f} total value"
-        return result
-
-    grants_by_month = group_by_month(op_grants)
+    grants_by_month = get_op_grants_view(monthly_totals).copy()
 
-    grants_by_month['hover'] = grants_by_month.apply(monthly_hover, axis=1)
+    grants_by_month['hover'] = hover_text(
+        grants_by_month,
+        '<b>{date:%B %Y}</b><br>{n_grants} grants<br>${total_amount:,.2f} total value',
+    )
     last_row = grants_by_month.iloc[len(grants_by_month)-1]
     last_month = last_row['date'].strftime('%B %Y')
     label = ''
@@ -222,14 +224,11 @@ def openphil_line_plot_section():
     )
 
 
+    # Plot the running total at the end of each grant's month
+    op_grants['Date'] = op_grants['Date'] + MonthEnd(0)
     op_grants['cumulative_amount'] = op_grants['Amount'].cumsum()
 
-    def cumulative_hover(row):
-        result = row['hover']
-        result += f"<br>${row.cumulative_amount:,.2f} total"
-        return result
-
-    op_grants['hover'] = op_grants.apply(cumulative_hover, axis=1)
+    op_grants['hover'] = hover_text(op_grants, '{hover}<br>${cumulative_amount:,.2f} total')
     grants_total = op_grants['cumulative_amount'].tolist()[-1]
     op_grants['label'] = f"<b>${grants_total/1e9:,.2f} Billion</b><br>Total Grants"
 
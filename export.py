@@ -0,0 +1,148 @@
+# Render the whole dashboard into a static bundle, e.g. after each refresh:
+#
+#   python -m utils.get_data.refresh_data && python export.py --out dist
+#
+# dist/ then holds index.html, the layout and callback definitions Dash
+# fetches on load (_dash-layout, _dash-dependencies), and every script and
+# stylesheet, renamed with a hash of its contents so they can be cached
+# forever. Serve it from nginx or a CDN, and forward only the interactive
+# endpoint (/_dash-update-component) to the Flask app; dist/nginx.conf
+# does both. Every section is rendered in full, so scrolling the page
+# needs no requests to the app at all.
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+from urllib.parse import urlsplit
+
+from dash.fingerprint import check_fingerprint
+
+from app import app
+from components.layout import build_layout
+from utils.get_data.data_version import read_data_version
+
+# Dash fetches these by name, so they can't be hashed
+LAYOUT_ENDPOINTS = ['_dash-layout', '_dash-dependencies']
+
+# Endpoints the static bundle can't answer
+INTERACTIVE_ENDPOINTS = ['_dash-update-component']
+
+NGINX_CONF = '''\
+# Include in a server block, with root set to the bundle's directory
+location = / {{
+    try_files /index.html =404;
+    add_header Cache-Control "no-cache";
+}}
+location ~ ^/(_dash-layout|_dash-dependencies)$ {{
+    default_type application/json;
+    add_header Cache-Control "no-cache";
+}}
+location ~ "\\.[0-9a-f]{{{hash_length}}}\\.[a-z]+$" {{
+    add_header Cache-Control "public, max-age=31536000, immutable";
+}}
+location ~ ^/({interactive})$ {{
+    proxy_pass {app_url};
+}}
+'''
+
+HASH_LENGTH = 12
+
+def hashed_name(path, content):
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    root, ext = os.path.splitext(path)
+    return f'{root}.{digest}{ext}'
+
+def fetch(client, url):
+    response = client.get(url)
+    if response.status_code != 200:
+        raise RuntimeError(f'{url} returned {response.status_code}')
+    return response.get_data()
+
+def write_file(out_dir, path, content):
+    path = os.path.join(out_dir, path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+def export_static(out_dir='dist', app_url='http://127.0.0.1:8000'):
+
+    app.layout = build_layout(lazy=False)
+    client = app.server.test_client()
+    index = fetch(client, '/').decode()
+
+    files = {}
+    hashed = {}
+
+    # Scripts and stylesheets linked from the page, which Dash serves with
+    # its own mtime fingerprint or ?m= query
+    for url in sorted(set(re.findall(r'(?:src|href)="(/[^"]+)"', index))):
+        content = fetch(client, url)
+        path, _ = check_fingerprint(urlsplit(url).path.lstrip('/'))
+        hashed[path] = hashed_name(path, content)
+        files[hashed[path]] = content
+        index = index.replace(f'"{url}"', f'"/{hashed[path]}"')
+
+    # Chunks the component bundles load at runtime, by name, from their
+    # own directory. Source maps are left out.
+    for namespace, paths in app.registered_paths.items():
+        for path in sorted(paths):
+            path = f'_dash-component-suites/{namespace}/{path}'
+            if path not in hashed and not path.endswith('.map'):
+                files[path] = fetch(client, '/' + path)
+
+    # Everything else in assets keeps its name, as the layout and
+    # stylesheets refer to images by path
+    assets_folder = app.config.assets_folder
+    for root, dirs, names in os.walk(assets_folder):
+        dirs[:] = [ d for d in dirs if d != 'data' and not d.startswith('.') ]
+        for name in names:
+            if name.startswith('.'):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                files['assets/' + os.path.relpath(path, assets_folder).replace(os.sep, '/')] = f.read()
+
+    for endpoint in LAYOUT_ENDPOINTS:
+        files[endpoint] = fetch(client, '/' + endpoint)
+
+    files['index.html'] = index.encode()
+    files['nginx.conf'] = NGINX_CONF.format(
+        hash_length = HASH_LENGTH,
+        interactive = '|'.join(INTERACTIVE_ENDPOINTS),
+        app_url = app_url.rstrip('/'),
+    ).encode()
+    files['manifest.json'] = json.dumps(
+        {
+            'data_version': read_data_version(),
+            'files': hashed,
+        },
+        indent=2,
+    ).encode()
+
+    # Build alongside the old bundle and swap it in at the end
+    tmp_dir = f'{out_dir.rstrip(os.sep)}.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    for path, content in files.items():
+        write_file(tmp_dir, path, content)
+
+    old_dir = f'{out_dir.rstrip(os.sep)}.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    size = sum(len(content) for content in files.values())
+    print(f'Exported {len(files)} files ({size/1e6:.1f}MB) to {out_dir}')
+    return files
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export the dashboard as a static bundle.')
+    parser.add_argument('--out', default='dist')
+    parser.add_argument('--app-url', default='http://127.0.0.1:8000', help='where nginx.conf forwards callbacks to')
+    args = parser.parse_args()
+
+    export_static(args.out, args.app_url)
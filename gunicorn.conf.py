@@ -0,0 +1,7 @@
+# Read by gunicorn from the working directory, e.g. `gunicorn app:server`
+
+def post_worker_init(worker):
+    # Each worker has loaded app by now; only serving workers poll for new
+    # data versions, see start_scheduler in app.py
+    from app import start_scheduler
+    start_scheduler()
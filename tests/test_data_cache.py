@@ -0,0 +1,60 @@
+import os
+
+import pandas as pd
+import pytest
+
+import utils.data_cache as data_cache
+from utils.data_cache import cached_frame, cache_path
+
+@pytest.fixture
+def source(tmp_path):
+    path = str(tmp_path / 'grants.csv')
+    pd.DataFrame({'Amount': [1, 2, 3]}).to_csv(path, index=False)
+    return path
+
+def counting_builder(path):
+    calls = []
+    def build():
+        calls.append(1)
+        return pd.read_csv(path)
+    return build, calls
+
+def test_unchanged_source_is_read_from_cache(source):
+    build, calls = counting_builder(source)
+
+    first = cached_frame(source, build)
+    second = cached_frame(source, build)
+
+    assert len(calls) == 1
+    assert os.path.exists(cache_path(source))
+    pd.testing.assert_frame_equal(first, second)
+
+def test_changed_source_rebuilds(source):
+    build, calls = counting_builder(source)
+    cached_frame(source, build)
+
+    pd.DataFrame({'Amount': [10, 20, 30]}).to_csv(source, index=False)
+    df = cached_frame(source, build)
+
+    assert len(calls) == 2
+    assert df['Amount'].tolist() == [10, 20, 30]
+
+def test_touched_source_with_same_content_is_reused(source):
+    build, calls = counting_builder(source)
+    cached_frame(source, build)
+
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    cached_frame(source, build)
+
+    assert len(calls) == 1
+
+def test_code_change_rebuilds(source, monkeypatch):
+    build, calls = counting_builder(source)
+    cached_frame(source, build)
+
+    # e.g. an edit to a formatter in utils/hover.py
+    monkeypatch.setattr(data_cache, 'FRAME_CODE', 'changed')
+    cached_frame(source, build)
+
+    assert len(calls) == 2
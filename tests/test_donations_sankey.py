@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from components.sections.donations_sankey import get_funding_long, load_funding, reload_funding
+
+# Amounts are in $M, as get_funding returns them
+FUNDING = pd.DataFrame(
+    [
+        ('Open Philanthropy', 'AI', 'MIRI', 12.0),
+        ('Open Philanthropy', 'AI', 'MIRI', 9.0),
+        ('Open Philanthropy', 'AI', 'CHAI', 20.0),
+        ('Open Philanthropy', 'AI', 'FAR', 0.5),
+        ('Open Philanthropy', 'AI', np.nan, 4.0),
+        ('Open Philanthropy', 'Policy', 'ASJ Action Fund', 25.0),
+        ('Open Philanthropy', 'Policy', 'Small Org', 1.5),
+        ('Open Philanthropy', 'Policy', 'Smaller Org', 1.5),
+        ('Open Philanthropy', 'Biosecurity', 'JHCHS', 3.0),
+        ('EA Funds', 'Far Future', 'Unknowns', 30.0),
+        ('EA Funds', 'Animal Welfare', 'Unknowns', 2.0),
+        ('GWWC', 'Global Poverty', 'AMF', 40.0),
+        ('GWWC', 'Global Poverty', 'SCI', 20.0),
+        ('GWWC', 'Global Poverty', 'GiveDirectly', 19.99),
+        ('GWWC', 'Unknowns', 'Unknowns', 5.0),
+    ],
+    columns=['Source', 'Cause Area', 'Organization', 'Amount'],
+)
+
+def previous_funding_long(funding, threshold):
+    # The per-(source, cause) loop get_funding_long replaced
+    funding_long = pd.DataFrame(columns=['From', 'To', 'Amount', 'Source'])
+
+    for source, cause in set(zip(funding['Source'], funding['Cause Area'])):
+
+        source_cause_df = funding[
+            (funding['Source']==source) & (funding['Cause Area']==cause)
+        ]
+
+        total_funding = source_cause_df['Amount'].sum()
+        funding_long.loc[len(funding_long)] = [source, cause, total_funding, source]
+
+        other_total = 0
+        for org in source_cause_df['Organization'].unique():
+            org_df = source_cause_df[source_cause_df['Organization']==org]
+            total_funding = org_df['Amount'].sum()
+
+            if total_funding < threshold:
+                other_total += total_funding
+                continue
+
+            funding_long.loc[len(funding_long)] = [cause, org, total_funding, source]
+
+        if other_total > 0:
+            funding_long.loc[len(funding_long)] = [cause, 'Other orgs', other_total, source]
+
+    return funding_long[funding_long['To']!='Unknowns']
+
+def sorted_links(funding_long):
+    return funding_long.sort_values(['Source', 'From', 'To']).reset_index(drop=True)
+
+@pytest.fixture
+def funding():
+    load_funding(FUNDING)
+    yield FUNDING
+    reload_funding()
+
+# Includes thresholds equal to org totals (21 for MIRI, 20 for CHAI and SCI)
+@pytest.mark.parametrize('threshold', [0.1, 1.5, 3, 19.99, 20, 21, 25, 30, 100])
+def test_funding_long_matches_previous(funding, threshold):
+    expected = sorted_links(previous_funding_long(funding, threshold))
+    result = sorted_links(get_funding_long(threshold))
+
+    assert result[['From', 'To', 'Source']].values.tolist() == expected[['From', 'To', 'Source']].values.tolist()
+    np.testing.assert_allclose(result['Amount'].astype(float), expected['Amount'].astype(float))
+
+def test_funding_totals_reused_across_thresholds(funding):
+    # Moving the slider back returns the same links
+    first = get_funding_long(20)
+    get_funding_long(1)
+    pd.testing.assert_frame_equal(get_funding_long(20), first)
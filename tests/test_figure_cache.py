@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+import utils.plots.figure_cache as figure_cache
+from utils.plots.figure_cache import cached_figure, figure_scope
+
+calls = []
+
+def top_orgs_figure(df, title=None):
+    calls.append(title)
+    return {'data': [{'x': df['Organization'].tolist(), 'y': df['Amount'].tolist()}], 'layout': {'title': title}}
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(figure_cache, 'FIGURE_CACHE_DIR', None)
+    figure_cache.figure_cache.clear()
+    calls.clear()
+    yield
+    figure_cache.figure_cache.clear()
+
+TOP_ORGS = pd.DataFrame({'Organization': ['AMF', 'SCI'], 'Amount': [100, 50]})
+
+def test_same_arguments_are_reused():
+    with figure_scope('1'):
+        first = cached_figure(top_orgs_figure, TOP_ORGS, title='Top')
+        second = cached_figure(top_orgs_figure, TOP_ORGS.copy(), title='Top')
+
+    assert calls == ['Top']
+    assert first == second
+
+def test_same_shape_other_contents_rebuilds():
+    # e.g. a fixed top-N frame after the data changed under the same version
+    changed = pd.DataFrame({'Organization': ['AMF', 'GiveDirectly'], 'Amount': [120, 60]})
+
+    with figure_scope('1'):
+        cached_figure(top_orgs_figure, TOP_ORGS, title='Top')
+        figure = cached_figure(top_orgs_figure, changed, title='Top')
+
+    assert len(calls) == 2
+    assert figure['data'][0]['x'] == ['AMF', 'GiveDirectly']
+
+def test_other_data_version_rebuilds():
+    with figure_scope('1'):
+        cached_figure(top_orgs_figure, TOP_ORGS, title='Top')
+    with figure_scope('2'):
+        cached_figure(top_orgs_figure, TOP_ORGS, title='Top')
+
+    assert len(calls) == 2
+
+def test_callers_get_their_own_copy():
+    with figure_scope('1'):
+        figure = cached_figure(top_orgs_figure, TOP_ORGS, title='Top')
+        figure['layout']['title'] = 'Changed'
+        figure['data'][0]['y'].append(0)
+        again = cached_figure(top_orgs_figure, TOP_ORGS, title='Top')
+
+    assert again['layout']['title'] == 'Top'
+    assert again['data'][0]['y'] == [100, 50]
+
+def test_disk_tier(tmp_path, monkeypatch):
+    monkeypatch.setattr(figure_cache, 'FIGURE_CACHE_DIR', str(tmp_path))
+
+    with figure_scope('1'):
+        first = cached_figure(top_orgs_figure, TOP_ORGS, title='Top')
+        figure_cache.figure_cache.clear()
+        second = cached_figure(top_orgs_figure, TOP_ORGS, title='Top')
+
+    assert calls == ['Top']
+    assert first == second
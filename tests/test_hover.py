@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.hover import hover_text, plotly_hover_template, hover_customdata, template_columns
+
+FRAME = pd.DataFrame({
+    'name': ['AMF', 'SCI', 'GiveDirectly', 'Helen Keller', 'Evidence Action'],
+    'int': [0, 7, 1234, 1234567, 10**12],
+    'negative': [-1, -999, -1000, -1234567, 0],
+    'float': [0.5, 2.675, 1234.5, -9876543.21, 1e-3],
+    'nan': [1.5, np.nan, 1234567.891, np.nan, 0.0],
+    'nullable': pd.array([1, 22, 333, 4444, 55555], dtype='Int64'),
+    'missing': pd.array([1, None, 1000, None, -5], dtype='Int64'),
+    'date': pd.to_datetime(['2015-01-31', '2019-07-01', '2020-02-29', '2021-12-31', '2024-06-15']),
+    'utc': pd.to_datetime(['2015-01-31T10:00', '2019-07-01T00:30', '2020-02-29T23:59', '2021-12-31T12:00', '2024-06-15T08:00'], utc=True),
+})
+
+def str_format(df, template):
+    # What hover_text replaces: str.format on every row
+    return df.apply(lambda row: template.format(**row), axis=1).tolist()
+
+@pytest.mark.parametrize('template', [
+    '{name}',
+    '<b>{name}</b><br>{int} grants',
+    '{int:,}', '{int:,d}', '{int:,.0f}', '{int:.2f}',
+    '{negative:,}', '{negative:,.0f}', '{negative:.1f}',
+    '{float}', '{float:,}', '{float:.1f}', '{float:,.2f}', '{float:.0f}',
+    '{nan}', '{nan:,.2f}', '{nan:.0f}',
+    '{nullable}', '{nullable:,}', '{nullable:,.0f}',
+    '{missing}',
+    '{date:%B %Y}', '{date:%d %b %Y}', '{utc:%d %b %Y}',
+    '{name}: ${float:,.2f} over {int:,} months since {date:%B %Y}',
+])
+def test_hover_text_matches_str_format(template):
+    assert hover_text(FRAME, template).tolist() == str_format(FRAME, template)
+
+def test_hover_text_keeps_index():
+    df = FRAME.set_index(pd.Index([10, 3, 7, 1, 5]))
+    assert hover_text(df, '{name}').index.tolist() == [10, 3, 7, 1, 5]
+
+@pytest.mark.parametrize('template', ['{name!r}', '{float:>10}', '{float:%}'])
+def test_hover_text_rejects_unsupported_templates(template):
+    with pytest.raises(ValueError):
+        hover_text(FRAME, template)
+
+def test_template_columns():
+    assert template_columns('<b>{name}</b> {int:,} {date:%Y}') == ['name', 'int', 'date']
+
+def test_plotly_hover_template_numbers_go_to_d3():
+    template, fields = plotly_hover_template('<b>{name}</b><br>{int:,} grants, ${float:,.2f}')
+
+    assert template == '<b>%{customdata[0]}</b><br>%{customdata[1]:,} grants, $%{customdata[2]:,.2f}<extra></extra>'
+    assert fields == [('name', ''), ('int', ''), ('float', '')]
+
+def test_plotly_hover_template_dates_are_formatted_here():
+    template, fields = plotly_hover_template('Posted {date:%d %b %Y}, {date:%Y}')
+
+    assert template == 'Posted %{customdata[0]}, %{customdata[1]}<extra></extra>'
+    assert fields == [('date', '%d %b %Y'), ('date', '%Y')]
+
+    customdata = hover_customdata(FRAME, fields)
+    assert customdata[:, 0].tolist() == [ f'{d:%d %b %Y}' for d in FRAME['date'] ]
+    assert customdata[:, 1].tolist() == [ f'{d:%Y}' for d in FRAME['date'] ]
+
+def test_plotly_hover_template_repeated_fields_share_customdata():
+    template, fields = plotly_hover_template('{name} {int:,} {name} {int:.1f}')
+
+    assert template == '%{customdata[0]} %{customdata[1]:,} %{customdata[0]} %{customdata[1]:.1f}<extra></extra>'
+    assert fields == [('name', ''), ('int', '')]
+
+def test_plotly_hover_template_reads_axes_from_the_trace():
+    template, fields = plotly_hover_template(
+        '{name}<br>{int:,} karma<br>{date:%B %Y}',
+        axes={'int': 'y', 'date': 'x'},
+    )
+
+    assert template == '%{customdata[0]}<br>%{y:,} karma<br>%{x|%B %Y}<extra></extra>'
+    assert fields == [('name', '')]
+
+def test_plotly_hover_template_unformatted_axis_uses_customdata():
+    # Without a spec the browser would format the axis value its own way
+    template, fields = plotly_hover_template('{int} grants', axes={'int': 'y'})
+
+    assert template == '%{customdata[0]} grants<extra></extra>'
+    assert fields == [('int', '')]
+
+@pytest.mark.parametrize('template', ['{name!s}', '{float:>10}'])
+def test_plotly_hover_template_rejects_unsupported_templates(template):
+    with pytest.raises(ValueError):
+        plotly_hover_template(template)
+
+def test_hover_customdata_raw_values():
+    customdata = hover_customdata(FRAME, [('name', ''), ('int', '')])
+
+    assert customdata.shape == (len(FRAME), 2)
+    assert customdata[:, 0].tolist() == FRAME['name'].tolist()
+    assert customdata[:, 1].tolist() == FRAME['int'].tolist()
+    assert hover_customdata(FRAME, []) is None
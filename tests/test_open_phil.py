@@ -0,0 +1,140 @@
+import pandas as pd
+from pandas.tseries.offsets import MonthEnd
+
+import components.sections.donations_sankey as donations_sankey
+from utils.get_data.open_phil import process_grants, build_grants_cube, monthly_totals
+
+GRANTS = pd.DataFrame(
+    {
+        'Grant': ['Deworming', 'Vitamin A', 'Reform', 'Reform 2', 'Action', 'Unnamed'],
+        'Organization Name': [
+            'Against Malaria Foundation ',
+            'Hellen Keller International',
+            'Alliance for Safety and Justice',
+            'Alliance for Safety and Justice',
+            'Alliance for Safety and Justice Action Fund',
+            None,
+        ],
+        'Focus Area': [
+            'Global Health & Development',
+            'Global Health & Development',
+            'Criminal Justice Reform',
+            'Criminal Justice Reform',
+            'Criminal Justice Reform',
+            'Other areas',
+        ],
+        'Amount': ['$1,500,000', '$250,000', '$10,000,000', '$12,015,000', '$3,000,000', None],
+        'Date': ['March 2020', 'July 2019', 'May 2018', 'June 2018', 'May 2018', 'January 2021'],
+    }
+)
+
+def previous_process_grants(grants_df):
+    # The per-row parsing process_grants replaced
+    grants_df['Amount'] = grants_df['Amount'].apply(
+        lambda x: int(str(x).replace('$', '').replace(',', '')) if pd.notnull(x) else 0
+    )
+
+    def normalize_orgname(orgname):
+        if pd.isnull(orgname):
+            return ''
+        orgname = str(orgname).strip()
+        if orgname == 'Hellen Keller International':
+            orgname = 'Helen Keller International'
+        if orgname == 'Alliance for Safety and Justice':
+            orgname = 'Alliance for Safety and Justice Action Fund'
+        return orgname
+    grants_df['Organization Name'] = grants_df['Organization Name'].apply(normalize_orgname)
+
+    grants_df['Date'] = pd.to_datetime(grants_df['Date'], format='%B %Y')
+    grants_df = grants_df.sort_values(by='Date', ascending=False)
+    grants_df['Date_readable'] = grants_df['Date'].dt.strftime('%B %Y')
+
+    def hover(row):
+        return f"<b>{row['Grant']}</b><br>Date: {row['Date_readable']}<br>Organization: {row['Organization Name']}<br>Amount: ${row['Amount']:,.0f}"
+    grants_df['hover'] = grants_df.apply(hover, axis=1)
+    grants_df['grants'] = 1
+
+    return grants_df
+
+def test_process_grants_matches_previous():
+    expected = previous_process_grants(GRANTS.copy())
+    result = process_grants(GRANTS.copy())
+
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+def previous_group_by_month(grants_df):
+    # The per-month loop monthly_totals replaced, with its organizations
+    # column filled from the organizations rather than the focus areas
+    months = grants_df['Date'] + MonthEnd(0)
+    dates = pd.date_range(start=months.min(), end=months.max(), freq='ME')
+    rows = []
+    for date in dates:
+        month = grants_df.loc[ months == date ]
+        rows.append({
+            'date': date,
+            'grants': month['Grant'].tolist(),
+            'focus_areas': month['Focus Area'].tolist(),
+            'organizations': month['Organization Name'].tolist(),
+            'total_amount': month['Amount'].sum(),
+            'n_grants': len(month),
+        })
+    return pd.DataFrame(rows)
+
+def test_monthly_totals_matches_previous():
+    grants = process_grants(GRANTS.copy())
+    expected = previous_group_by_month(grants)
+    result = monthly_totals(build_grants_cube(grants))
+
+    assert result['date'].tolist() == expected['date'].tolist()
+    assert result['total_amount'].tolist() == expected['total_amount'].tolist()
+    assert result['n_grants'].tolist() == expected['n_grants'].tolist()
+    # Grants within a month may come in another order
+    for (_, row), (_, expected_row) in zip(result.iterrows(), expected.iterrows()):
+        assert sorted(zip(row['grants'], row['focus_areas'], row['organizations'])) == \
+            sorted(zip(expected_row['grants'], expected_row['focus_areas'], expected_row['organizations']))
+
+def test_sankey_applies_org_name_fixes(monkeypatch):
+    # The Sankey used to read the raw names, so the Action Fund's own $3.0M
+    # and the $22.015M to 'Alliance for Safety and Justice' were two orgs
+    cube = build_grants_cube(process_grants(GRANTS.copy()))
+    monkeypatch.setattr(donations_sankey, 'get_op_grants_view', lambda view, *args: view(cube, *args))
+
+    op_grants = donations_sankey.get_op_grants()
+    totals = op_grants.groupby('Organization')['Amount'].sum()
+
+    assert totals['Alliance for Safety and Justice Action Fund'] == 25_015_000
+    assert 'Alliance for Safety and Justice' not in totals
+    assert totals['Helen Keller International'] == 250_000
+    assert totals['Against Malaria Foundation'] == 1_500_000
+    # Grants without an organization only count towards their cause area
+    assert op_grants['Organization'].isna().sum() == 1
+
+def test_first_boot_download_is_shared(tmp_path, monkeypatch):
+    import threading
+    import time
+    import components.sections.open_phil as open_phil_section
+
+    path = str(tmp_path / 'openphil_grants.csv')
+    downloads = []
+
+    def save_grants():
+        downloads.append(1)
+        time.sleep(0.2)
+        GRANTS.to_csv(path, index=False)
+        return True
+
+    monkeypatch.setattr(open_phil_section, 'OP_GRANTS_PATH', path)
+    monkeypatch.setattr(open_phil_section, 'save_grants', save_grants)
+    monkeypatch.setattr(open_phil_section, 'op_grants', None)
+
+    # A second caller waits for the download in progress instead of getting None
+    results = []
+    threads = [ threading.Thread(target=lambda: results.append(open_phil_section.get_op_grants())) for _ in range(2) ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(downloads) == 1
+    assert len(results) == 2
+    assert all(result is not None for result in results)
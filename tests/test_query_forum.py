@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+
+import utils.get_data.query_forum as query_forum
+from utils.get_data.query_forum import merge_posts, fetch_forum_data
+
+NOW = datetime.now(timezone.utc)
+
+def posted_at(days_ago):
+    return (NOW - timedelta(days=days_ago)).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+def post(url, days_ago, karma, comments=0):
+    return {
+        'title': url.title(),
+        'postedAt': posted_at(days_ago) if days_ago is not None else None,
+        'user': {'username': 'user', 'displayName': 'User'},
+        'coauthors': [],
+        'pageUrl': f'https://forum.effectivealtruism.org/posts/{url}',
+        'wordCount': 100,
+        'baseScore': karma,
+        'commentCount': comments,
+    }
+
+# What the forum returns today
+FORUM = [
+    post('new', 1, 5),
+    post('recent', 10, 40, 7),
+    post('older', 100, 12, 3),
+    post('oldest', 1000, 80, 20),
+    post('undated', None, 0),
+]
+
+# The stored copy from an earlier download, before 'new' was posted and
+# while 'recent' still had less karma
+STORED = [
+    post('recent', 10, 2),
+    post('older', 100, 12, 3),
+    post('oldest', 1000, 80, 20),
+    post('undated', None, 0),
+]
+
+def fake_get_posts(after=None):
+    results = [
+        dict(post) for post in FORUM
+        if after is None or (post['postedAt'] and post['postedAt'] > after)
+    ]
+    return {'data': {'posts': {'results': results}}}
+
+def by_url(posts):
+    return { post['pageUrl']: post for post in posts }
+
+def test_incremental_sync_matches_full_download(monkeypatch):
+    monkeypatch.setattr(query_forum, 'get_posts', fake_get_posts)
+    monkeypatch.setattr(query_forum, 'read_forum_data', lambda: {'data': {'posts': {'results': [dict(post) for post in STORED]}}})
+
+    # The previous implementation always downloaded everything
+    full = fetch_forum_data(incremental=False)['data']['posts']['results']
+    incremental = fetch_forum_data()['data']['posts']['results']
+
+    assert by_url(incremental) == by_url(full)
+
+def test_merge_posts_replaces_by_page_url():
+    merged = merge_posts(STORED, [post('recent', 10, 40, 7), post('new', 1, 5)])
+
+    assert [ p['pageUrl'].rsplit('/', 1)[1] for p in merged ] == ['new', 'recent', 'older', 'oldest', 'undated']
+    assert by_url(merged)[post('recent', 10, 0)['pageUrl']]['baseScore'] == 40
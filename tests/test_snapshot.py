@@ -0,0 +1,75 @@
+import os
+
+import pandas as pd
+import pytest
+from dash import html
+
+import utils.snapshot as snapshot
+from utils.snapshot import write_snapshot, read_snapshot, data_stats
+
+SETTINGS = {'lazy_sections': True, 'source': 'abc'}
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    pd.DataFrame({'Source': ['GWWC'], 'Amount': [126751939]}).to_csv(data_dir / 'misc.csv', index=False)
+    (data_dir / 'VERSION').write_text('1')
+    monkeypatch.setattr(snapshot, 'DATA_DIR', str(data_dir))
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_DIR', str(tmp_path / 'build'))
+    return data_dir
+
+def build(version='1'):
+    return write_snapshot(
+        version,
+        html.Div([html.H2('Title')], id='page'),
+        {'section': [html.P('text')]},
+        {'funding': pd.DataFrame({'Amount': [1.5, 2.5]})},
+        SETTINGS,
+        data_stats(),
+    )
+
+def test_snapshot_round_trip(data_dir):
+    build()
+    layout, sections, datasets = read_snapshot('1', SETTINGS)
+
+    assert layout.id == 'page'
+    assert layout.children[0].children == 'Title'
+    assert sections['section'][0].children == 'text'
+    assert datasets['funding']['Amount'].tolist() == [1.5, 2.5]
+
+def test_snapshot_rejected_after_data_edit(data_dir):
+    build()
+    # e.g. a hand edit of misc.csv, which doesn't bump the data version
+    pd.DataFrame({'Source': ['GWWC'], 'Amount': [1267519390]}).to_csv(data_dir / 'misc.csv', index=False)
+
+    assert read_snapshot('1', SETTINGS) is None
+
+def test_snapshot_rejected_after_new_data_file(data_dir):
+    build()
+    (data_dir / 'ea_funds_balances.csv').write_text('fund,amount\n')
+
+    assert read_snapshot('1', SETTINGS) is None
+
+def test_snapshot_kept_when_data_only_touched(data_dir):
+    build()
+    path = data_dir / 'misc.csv'
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert read_snapshot('1', SETTINGS) is not None
+
+def test_snapshot_ignores_version_marker_and_caches(data_dir):
+    build()
+    (data_dir / 'VERSION').write_text('2')
+    (data_dir / 'misc.parquet').write_bytes(b'cache')
+    (data_dir / '.refresh.lock').write_text('')
+
+    assert read_snapshot('1', SETTINGS) is not None
+
+def test_snapshot_rejected_with_other_settings(data_dir):
+    build()
+    assert read_snapshot('1', dict(SETTINGS, lazy_sections=False)) is None
+
+def test_missing_snapshot(data_dir):
+    assert read_snapshot('1', SETTINGS) is None
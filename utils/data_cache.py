@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import pandas as pd
+from utils.get_data.atomic import atomic_write
+
+# The cache is an optimisation only: without pyarrow every frame is rebuilt
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+METADATA_KEY = b'eadata_cache'
+
+# Relative source paths are relative to the repository, not the working directory
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def source_files(root):
+    root = os.path.join(ROOT_DIR, root)
+    if os.path.isfile(root):
+        yield root
+        return
+    for directory, dirs, names in os.walk(root):
+        dirs.sort()
+        for name in sorted(names):
+            if name.endswith('.py'):
+                yield os.path.join(directory, name)
+
+def source_hash(paths):
+    # Changes whenever the code under paths (files or directories) does
+    sha1 = hashlib.sha1()
+    for root in paths:
+        for path in source_files(root):
+            with open(path, 'rb') as f:
+                sha1.update(f.read())
+    return sha1.hexdigest()
+
+# A builder's output depends on whatever it calls, e.g. the hover text
+# formatters in utils/hover.py, so any code change rebuilds every frame
+FRAME_CODE = source_hash(['components', 'utils'])
+
+def cache_path(source, name=None):
+    # e.g. assets/data/openphil_grants.csv -> assets/data/openphil_grants.parquet
+    stem = os.path.splitext(source)[0]
+    if name:
+        stem += f'.{name}'
+    return stem + '.parquet'
+
+def file_hash(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+def source_stats(sources):
+    stats = {}
+    for source in sources:
+        stat = os.stat(source)
+        stats[source] = {'mtime': stat.st_mtime_ns, 'size': stat.st_size}
+    return stats
+
+def read_metadata(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+        return json.loads(metadata[METADATA_KEY])
+    except Exception:
+        return None
+
+def write_frame(path, df, metadata):
+    table = pa.Table.from_pandas(df)
+    schema_metadata = dict(table.schema.metadata or {})
+    schema_metadata[METADATA_KEY] = json.dumps(metadata).encode()
+    table = table.replace_schema_metadata(schema_metadata)
+    with atomic_write(path, 'wb') as f:
+        pq.write_table(table, f)
+
+def sources_unchanged(recorded, stats):
+    # recorded holds the mtime, size and sha1 of each source when it was
+    # last read, and stats their current mtime and size
+    if recorded is None or set(recorded) != set(stats):
+        return False
+
+    # Unchanged mtimes and sizes are trusted without reading the sources
+    if all(
+        recorded[source]['mtime'] == stats[source]['mtime']
+        and recorded[source]['size'] == stats[source]['size']
+        for source in stats
+    ):
+        return True
+
+    # Otherwise fall back to comparing content hashes, so that a re-download
+    # of identical data doesn't force a rebuild
+    return all(
+        recorded[source]['sha1'] == file_hash(source)
+        for source in stats
+    )
+
+def is_fresh(metadata, stats, code):
+    if metadata is None or metadata.get('code') != code:
+        return False
+    return sources_unchanged(metadata['sources'], stats)
+
+def cached_frame(sources, build, name=None):
+    '''
+    Return the DataFrame produced by build(), storing it as a typed parquet
+    file next to the first source. The stored copy is reused for as long as
+    the sources and the code are unchanged.
+    '''
+
+    if type(sources) == str:
+        sources = [ sources ]
+
+    if pq is None:
+        return build()
+
+    path = cache_path(sources[0], name)
+    stats = source_stats(sources)
+    metadata = read_metadata(path)
+    if is_fresh(metadata, stats, FRAME_CODE):
+        df = pd.read_parquet(path)
+        # Record the new mtimes so the next load takes the fast path again
+        if any(metadata['sources'][source]['mtime'] != stats[source]['mtime'] for source in sources):
+            for source in sources:
+                metadata['sources'][source].update(stats[source])
+            try:
+                write_frame(path, df, metadata)
+            except Exception as e:
+                print(f'Could not update cache {path}: {e}')
+        return df
+
+    for source in sources:
+        stats[source]['sha1'] = file_hash(source)
+
+    df = build()
+    if df is None:
+        return df
+
+    try:
+        write_frame(path, df, {'code': FRAME_CODE, 'sources': stats})
+    except Exception as e:
+        print(f'Could not write cache {path}: {e}')
+
+    return df
@@ -1,126 +1,172 @@
 from bs4 import BeautifulSoup
 import re
-import requests
+from utils.get_data import http_client
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timezone
 import json
+from concurrent.futures import ThreadPoolExecutor
+from utils.get_data.atomic import atomic_write
+
+EA_FUNDS_GRANTS_PATH = './assets/data/ea_funds_grants.csv'
+EA_FUNDS_BALANCES_PATH = './assets/data/ea_funds_balances.csv'
+FOUNDERS_PLEDGE_PATH = './assets/data/founders_pledge.json'
 
 def url_to_soup(url):
-    page = requests.get(url, headers={'User-Agent': ''})
+    page = http_client.get(url, headers={'User-Agent': ''})
     return BeautifulSoup(page.content, features="html.parser")
 
 
-def download_ea_funds_grants():
-    # The data can be seen at 'https://app.effectivealtruism.org/funds/{}/payouts'.
-    # But the above page isn't static so can't be scraped.
-
-    # Found this by poking around in developer tools for 20 minutes:
-    data_url = 'https://cdn.contentful.com/spaces/afdyh2iav3iy/entries?access_token=630f127009ba9d044dd156ae8a6b9c5b26c66c054508f720e8b0dbbfa165d4e5&content_type=payoutReport&include=2&order=-fields.date&fields.fund.sys.contentType.sys.id=fund&fields.fund.fields.slug={}'
- 
-    fund_names = [
-        'global-development',
-        'animal-welfare',
-        'far-future',
-        'ea-community',
-    ]
-
-    # Store all grants in a dataframe
-    grants = pd.DataFrame(columns=[
-        'fund',
-        'amount',
-        'date',
-        'title',
-    ])
-
-    for fund_name in fund_names:
+EA_FUND_NAMES = [
+    'global-development',
+    'animal-welfare',
+    'far-future',
+    'ea-community',
+]
+
+# The data can be seen at 'https://app.effectivealtruism.org/funds/{}/payouts'.
+# But the above page isn't static so can't be scraped.
+
+# Found this by poking around in developer tools for 20 minutes:
+EA_FUNDS_DATA_URL = 'https://cdn.contentful.com/spaces/afdyh2iav3iy/entries?access_token=630f127009ba9d044dd156ae8a6b9c5b26c66c054508f720e8b0dbbfa165d4e5&content_type=payoutReport&include=2&order=-fields.date&fields.fund.sys.contentType.sys.id=fund&fields.fund.fields.slug={fund}&skip={skip}&limit={limit}'
+
+# Contentful allows up to 1000 entries per page
+EA_FUNDS_PAGE_SIZE = 500
+
+def download_fund_grants(fund_name):
+
+    grants = {
+        'fund': [],
+        'amount': [],
+        'date': [],
+        'title': [],
+    }
+
+    # Page through every payout report, not just the first page
+    skip = 0
+    while True:
 
         # Retrieve json data
-        fund_url = data_url.format(fund_name)
-        fund_response = requests.get(fund_url)
+        fund_url = EA_FUNDS_DATA_URL.format(fund=fund_name, skip=skip, limit=EA_FUNDS_PAGE_SIZE)
+        fund_response = http_client.get(fund_url)
         fund_data = json.loads(fund_response.content)
+        items = fund_data['items']
 
         # Parse each grant
-        for grant in fund_data['items']:
+        for grant in items:
 
             fields = grant['fields']
-            title = fields['title']
-            amount = fields['amount']
-
+            grants['fund'].append(fund_name)
+            grants['amount'].append(fields['amount'])
             # date format is 2020-03-27
-            date = datetime.strptime(fields['date'], '%Y-%m-%d')
-
-            # Add to dataframe
-            grants.loc[len(grants), :] = [
-                fund_name,
-                amount,
-                date,
-                title,
-            ]
+            grants['date'].append(fields['date'])
+            grants['title'].append(fields['title'])
 
             # # There's also recipients data which I can't parse
             # recipients = fields['recipients']
             # for recipient in recipients:
             #     recipient_id = recipient['sys']['id'] # I don't know what to do with this
 
+        skip += len(items)
+        if not items or skip >= fund_data['total']:
+            break
+
     return grants
 
-def download_ea_funds_balances():
-    
-    fund_names = [
-        'global-development',
-        'animal-welfare',
-        'far-future',
-        'ea-community',
-    ]
-
-    body_left = "{\"operationName\":\"getXeroBalanceSheetByOrganization\",\"variables\":{\"reference\":\""
-    body_right = "\",\"nearestReportDate\":\"2020-07-28T05:59:22.337Z\"},\"query\":\"query getXeroBalanceSheetByOrganization($reference: String!, $nearestReportDate: Date) {\\n  XeroBalanceSheet: getXeroBalanceSheetMonthlyTotalByReference(reference: $reference, nearestReportDate: $nearestReportDate) {\\n    edges {\\n      node {\\n        reportDate\\n        reference\\n        amount\\n        __typename\\n      }\\n      __typename\\n    }\\n    __typename\\n  }\\n}\\n\"}"
-
-    balances = pd.DataFrame(columns=[
-        'fund',
-        'amount',
-        'as of',
-    ])
-
-    for fund_name in fund_names:
-
-        # send HTTP request
-        body = body_left + fund_name + body_right
-        response = requests.post(
-          "https://parfit.effectivealtruism.org/graphql",
-          headers = {
-            "accept": "*/*",
-            "accept-language": "en-GB,en;q=0.9,de;q=0.8,fr;q=0.7,ru;q=0.6",
-            "content-type": "application/json",
-            "sec-fetch-dest": "empty",
-            "sec-fetch-mode": "cors",
-            "sec-fetch-site": "same-site"
-          },
-          data = body
-        )
-
-        # parse request
-        content = json.loads(response.content)
-        node = content['data']['XeroBalanceSheet']['edges'][0]['node']
-        balance = node['amount']
-        as_of = node['reportDate']
-
-        # add to balances dataframe
-        balances.loc[len(balances), :] = [
-            fund_name,
-            balance,
-            as_of,
-        ]
-
-    return balances
+def download_ea_funds_grants():
+
+    # Fetch all the funds at once
+    with ThreadPoolExecutor(max_workers=len(EA_FUND_NAMES)) as executor:
+        fund_grants = list(executor.map(download_fund_grants, EA_FUND_NAMES))
+
+    # Store all grants in a dataframe, built in one go from the column lists
+    grants = pd.DataFrame({
+        col: [ value for fund in fund_grants for value in fund[col] ]
+        for col in ['fund', 'amount', 'date', 'title']
+    })
+    grants['date'] = pd.to_datetime(grants['date'], format='%Y-%m-%d')
+
+    return grants
+
+def write_ea_funds_grants(grants):
+    with atomic_write(EA_FUNDS_GRANTS_PATH) as f:
+        grants.to_csv(f, index=False)
+
+def save_ea_funds_grants():
+    write_ea_funds_grants(download_ea_funds_grants())
+
+EA_FUNDS_BALANCES_URL = 'https://parfit.effectivealtruism.org/graphql'
+
+balance_field = """
+  %(alias)s: getXeroBalanceSheetMonthlyTotalByReference(reference: $%(alias)s, nearestReportDate: $nearestReportDate) {
+    edges {
+      node {
+        reportDate
+        reference
+        amount
+      }
+    }
+  }"""
+
+def fund_alias(fund_name):
+    # GraphQL names can't contain dashes
+    return fund_name.replace('-', '_')
+
+def balances_query(fund_names):
+    # One aliased field per fund, so every balance comes back in one request
+    variables = ''.join(
+        f', ${fund_alias(fund_name)}: String!' for fund_name in fund_names
+    )
+    fields = ''.join(
+        balance_field % {'alias': fund_alias(fund_name)} for fund_name in fund_names
+    )
+    return f'query getXeroBalanceSheetsByOrganization($nearestReportDate: Date{variables}) {{{fields}\n}}'
+
+def download_ea_funds_balances(report_date=None, fund_names=EA_FUND_NAMES):
+
+    # The balance sheet nearest to this date is returned for each fund
+    if report_date is None:
+        report_date = datetime.now(timezone.utc)
+    report_date = pd.Timestamp(report_date).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+    variables = { fund_alias(fund_name): fund_name for fund_name in fund_names }
+    variables['nearestReportDate'] = report_date
+
+    # send HTTP request
+    response = http_client.post(
+      EA_FUNDS_BALANCES_URL,
+      headers = {
+        "accept": "*/*",
+        "accept-language": "en-GB,en;q=0.9,de;q=0.8,fr;q=0.7,ru;q=0.6",
+        "sec-fetch-dest": "empty",
+        "sec-fetch-mode": "cors",
+        "sec-fetch-site": "same-site"
+      },
+      json = {
+        'operationName': 'getXeroBalanceSheetsByOrganization',
+        'variables': variables,
+        'query': balances_query(fund_names),
+      },
+    )
+
+    # parse request
+    content = response.json()['data']
+    nodes = [ content[fund_alias(fund_name)]['edges'][0]['node'] for fund_name in fund_names ]
+
+    return pd.DataFrame({
+        'fund': fund_names,
+        'amount': pd.to_numeric([ node['amount'] for node in nodes ]),
+        'as of': pd.to_datetime([ node['reportDate'] for node in nodes ], format='ISO8601'),
+    })
+
+def write_ea_funds_balances(balances):
+    with atomic_write(EA_FUNDS_BALANCES_PATH) as f:
+        balances.to_csv(f, index=False)
 
 def scrape_founders_pledge():
     fp_url = 'https://founderspledge.com/'
     soup = url_to_soup(fp_url)
 
     # Scrape total pledged
-    with open('text', 'w') as f:
-        f.write(str(soup))
     pledge_str = soup.select('div.resource--stat--total-value-pledged')[0].get_text()
     pledge_pattern = r'\$(\d.\d\d) billion'
     pledge_match  = re.findall(pledge_pattern, pledge_str)[0]
@@ -130,7 +176,7 @@ def scrape_founders_pledge():
     committed_str = soup.select('div.resource--stat--fulfilled-commitments')[0].get_text()
     committed_pattern = r'\$(\d+) million'
     committed_match  = re.findall(committed_pattern, committed_str)[0]
-    total_committed = round( float(pledge_match) * 10**6 )
+    total_committed = round( float(committed_match) * 10**6 )
 
     # Scrape number members
     members = soup.select('div.resource--stat--in-30-countries')[0].get_text()
@@ -141,9 +187,13 @@ def scrape_founders_pledge():
     n_members, n_countries = int(members_match), int(countries_match)
 
     return {
-        'pleged': total_pledged,
+        'pledged': total_pledged,
         'committed': total_committed,
         'members': n_members,
         'countries': n_countries
     }
 
+def write_founders_pledge(stats):
+    with atomic_write(FOUNDERS_PLEDGE_PATH) as f:
+        f.write(json.dumps(stats))
+
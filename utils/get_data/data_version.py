@@ -0,0 +1,20 @@
+import os
+import time
+from utils.get_data.atomic import atomic_write
+
+# Written after every successful refresh. Workers compare it against the
+# version they last loaded to know when to reload their data and layout.
+DATA_VERSION_PATH = './assets/data/VERSION'
+
+def read_data_version():
+    try:
+        with open(DATA_VERSION_PATH, 'r') as f:
+            return f.read().strip() or '0'
+    except OSError:
+        return '0'
+
+def bump_data_version():
+    version = str(time.time_ns())
+    with atomic_write(DATA_VERSION_PATH) as f:
+        f.write(version)
+    return version
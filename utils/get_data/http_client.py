@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.get_data.atomic import atomic_write
+
+# One pooled session shared by every fetcher, so repeated requests to the
+# same host reuse their keep-alive connections.
+
+HTTP_CACHE_DIR = './.http_cache'
+
+# When set, every request goes to this server instead of the real upstream,
+# with the original host kept as the first path segment, e.g.
+# https://cdn.contentful.com/spaces/... -> http://127.0.0.1:8000/cdn.contentful.com/spaces/...
+# See utils.get_data.stand_in for a server that answers these.
+upstream_url = os.environ.get('EADATA_UPSTREAM_URL')
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (10, 60)
+
+MAX_REQUESTS_PER_HOST = 4
+
+RETRY = Retry(
+    total=4,
+    backoff_factor=1,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=frozenset(['GET', 'HEAD', 'POST']),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+session = requests.Session()
+adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=MAX_REQUESTS_PER_HOST,
+    max_retries=RETRY,
+)
+session.mount('https://', adapter)
+session.mount('http://', adapter)
+
+host_semaphores = {}
+host_semaphores_lock = threading.Lock()
+
+def host_semaphore(url):
+    host = urlsplit(url).netloc
+    with host_semaphores_lock:
+        if host not in host_semaphores:
+            host_semaphores[host] = threading.BoundedSemaphore(MAX_REQUESTS_PER_HOST)
+        return host_semaphores[host]
+
+def set_upstream_url(url):
+    global upstream_url
+    upstream_url = url
+
+def resolve_url(url):
+    if not upstream_url:
+        return url
+    parts = urlsplit(url)
+    resolved = f'{upstream_url.rstrip("/")}/{parts.netloc}{parts.path}'
+    if parts.query:
+        resolved += f'?{parts.query}'
+    return resolved
+
+def request(method, url, timeout=DEFAULT_TIMEOUT, **kwargs):
+    # Concurrency is limited per original host, even when redirected upstream
+    with host_semaphore(url):
+        return session.request(method, resolve_url(url), timeout=timeout, **kwargs)
+
+
+# Validator cache: the ETag / Last-Modified of each GET response are kept on
+# disk together with its body, so an unchanged resource costs only a 304.
+
+def cache_paths(url):
+    key = hashlib.sha1(url.encode()).hexdigest()
+    return (
+        os.path.join(HTTP_CACHE_DIR, f'{key}.json'),
+        os.path.join(HTTP_CACHE_DIR, f'{key}.body'),
+    )
+
+def read_cache_entry(url):
+    meta_path, body_path = cache_paths(url)
+    try:
+        with open(meta_path, 'r') as f:
+            entry = json.load(f)
+        with open(body_path, 'rb') as f:
+            entry['body'] = f.read()
+    except (OSError, ValueError):
+        return None
+    if entry.get('url') != url:
+        return None
+    return entry
+
+def write_cache_entry(url, response):
+    meta_path, body_path = cache_paths(url)
+    entry = {
+        'url': url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'headers': {
+            key: value for key, value in response.headers.items()
+            if key.lower() in ('content-type', 'etag', 'last-modified')
+        },
+    }
+    try:
+        # body first, so the metadata never points at a missing body
+        with atomic_write(body_path, 'wb') as f:
+            f.write(response.content)
+        with atomic_write(meta_path) as f:
+            json.dump(entry, f)
+    except OSError as e:
+        print(f'Could not cache {url}: {e}')
+
+def cached_response(url, entry):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = entry['body']
+    response.headers.update(entry['headers'])
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.from_cache = True
+    return response
+
+def get(url, headers=None, use_cache=True, **kwargs):
+    headers = dict(headers or {})
+
+    # Responses from a stand-in upstream are cached separately from the real ones
+    cache_url = resolve_url(url)
+    entry = read_cache_entry(cache_url) if use_cache else None
+    if entry:
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    response = request('GET', url, headers=headers, **kwargs)
+
+    if response.status_code == 304 and entry:
+        return cached_response(cache_url, entry)
+
+    response.from_cache = False
+    if use_cache and response.ok and ('ETag' in response.headers or 'Last-Modified' in response.headers):
+        write_cache_entry(cache_url, response)
+
+    return response
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
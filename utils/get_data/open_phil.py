@@ -1,9 +1,12 @@
-import requests
+from utils.get_data import http_client
 import os
 import pandas as pd
+from pandas.tseries.offsets import MonthEnd
 from datetime import datetime
 from io import StringIO
 from bs4 import BeautifulSoup
+from utils.get_data.atomic import atomic_write
+from utils.hover import hover_text
 
 def download_grants():
     # IMPORTANT: This URL may need to be updated manually if Open Philanthropy changes their data access method
@@ -19,7 +22,7 @@ def download_grants():
         }
         
         # Download the CSV file
-        response = requests.get(openphil_url, headers=headers)
+        response = http_client.get(openphil_url, headers=headers)
         response.raise_for_status()
         
         # Return the CSV content
@@ -30,12 +33,25 @@ def download_grants():
         print("Note: The URL may need to be updated with a new nonce from Open Philanthropy's website")
         return None
 
-def save_grants():
-    data_dir = os.path.abspath('./assets/data/')
-    if not os.path.exists(data_dir):
-        os.makedirs(data_dir)
+OP_GRANTS_PATH = './assets/data/openphil_grants.csv'
+
+OP_GRANTS_COLUMNS = ['Grant', 'Organization Name', 'Focus Area', 'Amount', 'Date']
+
+def validate_grants(df):
+    # A download only replaces the local snapshot if it can be processed
+    missing = [ col for col in OP_GRANTS_COLUMNS if col not in df.columns ]
+    if missing:
+        print(f"Downloaded grants are missing columns: {missing}")
+        return False
+    if df.empty:
+        print("Downloaded grants are empty")
+        return False
+    if process_grants(df.copy()) is None:
+        print("Downloaded grants could not be processed")
+        return False
+    return True
 
-    grants_raw = download_grants()
+def write_grants(grants_raw):
     if grants_raw is None:
         print("Failed to download grants data")
         return False
@@ -44,37 +60,44 @@ def save_grants():
         # Parse the CSV data
         df = pd.read_csv(StringIO(grants_raw))
         print(f'Latest OP grant date: {df["Date"].max() if "Date" in df.columns else "Unknown"}')
-        
+
+        if not validate_grants(df):
+            return False
+
         # Save to CSV
-        grants_path = os.path.join(data_dir, 'openphil_grants.csv')
-        df.to_csv(grants_path, index=False)
-        print(f"Successfully saved grants data to {grants_path}")
+        with atomic_write(OP_GRANTS_PATH) as f:
+            df.to_csv(f, index=False)
+        print(f"Successfully saved grants data to {os.path.abspath(OP_GRANTS_PATH)}")
         return True
     except Exception as e:
         print(f"Error processing grants data: {e}")
         return False
 
+def save_grants():
+    return write_grants(download_grants())
+
+# Misspelled or renamed organizations in the Open Philanthropy export
+ORG_NAME_FIXES = {
+    'Hellen Keller International': 'Helen Keller International',
+    'Alliance for Safety and Justice': 'Alliance for Safety and Justice Action Fund',
+}
+
+def parse_amounts(amounts):
+    # '$1,500,000' -> 1500000, missing -> 0
+    amounts = amounts.astype('string').str.replace(r'[$,]', '', regex=True)
+    return pd.to_numeric(amounts).fillna(0).astype('int64')
+
+def normalize_org_names(names):
+    # missing names stay missing
+    return names.str.strip().replace(ORG_NAME_FIXES)
+
 def process_grants(grants_df):
     if grants_df is None or grants_df.empty:
         return None
 
     try:
-        # Clean amount column
-        grants_df['Amount'] = grants_df['Amount'].apply(
-            lambda x: int(str(x).replace('$', '').replace(',', '')) if pd.notnull(x) else 0
-        )
-
-        # Normalize organization names
-        def normalize_orgname(orgname):
-            if pd.isnull(orgname):
-                return ''
-            orgname = str(orgname).strip()
-            if orgname == 'Hellen Keller International':
-                orgname = 'Helen Keller International'
-            if orgname == 'Alliance for Safety and Justice':
-                orgname = 'Alliance for Safety and Justice Action Fund'
-            return orgname
-        grants_df['Organization Name'] = grants_df['Organization Name'].apply(normalize_orgname)
+        grants_df['Amount'] = parse_amounts(grants_df['Amount'])
+        grants_df['Organization Name'] = normalize_org_names(grants_df['Organization Name']).fillna('')
 
         # Process dates
         grants_df['Date'] = pd.to_datetime(grants_df['Date'], format='%B %Y')
@@ -82,14 +105,10 @@ def process_grants(grants_df):
         grants_df['Date_readable'] = grants_df['Date'].dt.strftime('%B %Y')
 
         # Add hover text
-        def hover(row):
-            grant = row['Grant']
-            org = row['Organization Name']
-            area = row['Focus Area']
-            date = row['Date_readable']
-            amount = row['Amount']
-            return f'<b>{grant}</b><br>Date: {date}<br>Organization: {org}<br>Amount: ${amount:,.0f}'
-        grants_df['hover'] = grants_df.apply(hover, axis=1)
+        grants_df['hover'] = hover_text(
+            grants_df,
+            '<b>{Grant}</b><br>Date: {Date_readable}<br>Organization: {Organization Name}<br>Amount: ${Amount:,.0f}',
+        )
 
         # Add grants count
         grants_df['grants'] = 1
@@ -99,30 +118,50 @@ def process_grants(grants_df):
         print(f"Error processing grants: {e}")
         return None
 
-def group_by_month(grants_df):
-
-    min_date = grants_df['Date'].min()
-    max_date = grants_df['Date'].max()
-    dates = pd.date_range(start=min_date, end=max_date, freq='M')
-
-    grants_by_month = pd.DataFrame(columns=[
-        'date',
-        'total_amount',
-        'n_grants',
-    ])
-
-    for i, date in enumerate(dates):
-        grants_by_month_i = grants_df.loc[ grants_df['Date'] == date ]
-        grants_by_month.loc[i, 'date'] = date
-        grants_by_month.loc[i, 'total_amount'] = grants_by_month_i['Amount'].sum()
-        grants_by_month.loc[i, 'n_grants'] = len(grants_by_month_i)
-
-    return grants_by_month
-
-def group_by_org(grants_df):
-    orgs_df = op_grants.groupby(by='Organization Name', as_index=False).sum()
-    orgs_df = orgs_df.sort_values(by='Amount')
-
-def group_by_focus_area(grants_df):
-    orgs_df = op_grants.groupby(by='Organization Name', as_index=False).sum()
-    orgs_df = orgs_df.sort_values(by='Amount')
+# The grants cube holds the total amount, number and names of the grants
+# for every (focus area, organization, month) that has any grants. Totals
+# along any of those dimensions are a rollup of the cube rather than of the
+# grants.
+
+CUBE_DIMENSIONS = ['Focus Area', 'Organization Name', 'month']
+
+def build_grants_cube(grants_df):
+    return grants_df.groupby(
+        [grants_df['Focus Area'], grants_df['Organization Name'], (grants_df['Date'] + MonthEnd(0)).rename('month')],
+        dropna=False,
+    ).agg(
+        Amount=('Amount', 'sum'),
+        grants=('Amount', 'size'),
+        grant_names=('Grant', list),
+    ).reset_index()
+
+def rollup_grants(grants_cube, by):
+    return grants_cube.groupby(list(by), dropna=False)[['Amount', 'grants']].sum().reset_index()
+
+def group_by_org(grants_cube):
+    return rollup_grants(grants_cube, ['Organization Name']).sort_values(by='Amount')
+
+def group_by_focus_area(grants_cube):
+    return rollup_grants(grants_cube, ['Focus Area']).sort_values(by='Amount')
+
+def monthly_totals(grants_cube):
+    # One row per month from the first grant to the last, including empty
+    # months, with the month's total, count and lists of grants and of each
+    # grant's focus area and organization
+    totals = rollup_grants(grants_cube, ['month']).set_index('month')
+    totals = totals.rename(columns={'Amount': 'total_amount', 'grants': 'n_grants'})
+
+    grants = grants_cube[['month', 'grant_names', 'Focus Area', 'Organization Name']].explode('grant_names')
+    lists = grants.groupby('month').agg(
+        grants=('grant_names', list),
+        focus_areas=('Focus Area', list),
+        organizations=('Organization Name', list),
+    )
+
+    dates = pd.date_range(start=totals.index.min(), end=totals.index.max(), freq='ME', name='date')
+    totals = totals.reindex(dates, fill_value=0)
+    lists = lists.reindex(dates)
+    for col in ['grants', 'focus_areas', 'organizations']:
+        totals[col] = [ x if isinstance(x, list) else [] for x in lists[col] ]
+
+    return totals.reset_index()
@@ -1,5 +1,8 @@
-import requests
+from utils.get_data import http_client
 import json
+import os
+from datetime import datetime, timedelta, timezone
+from utils.get_data.atomic import atomic_write
 
 # Queries can be tested at https://forum.effectivealtruism.org/graphiql
 
@@ -8,7 +11,7 @@ forum_query = '''
   posts (
     input: {
       terms: {
-        offset:%d
+        %s
       }
     }
   ) {
@@ -32,29 +35,90 @@ forum_query = '''
 }
 '''
 
-def get_forum_data(offset=0):
-    print(f'Getting forum data from offset={offset}')
+FORUM_DATA_PATH = './assets/data/ea_forum.json'
+
+# Karma and comment counts keep changing for a while after a post goes up,
+# so an incremental sync also re-fetches every post from this many days back.
+TRAILING_WINDOW_DAYS = 30
+
+def get_forum_data(offset=0, after=None):
+    print(f'Getting forum data from offset={offset}' + (f' after {after}' if after else ''))
+    terms = f'offset:{offset}'
+    if after:
+        terms += f', after:"{after}"'
     graphql_url = 'https://forum.effectivealtruism.org/graphql?'
-    response = requests.post(graphql_url, json={'query': forum_query % offset})
+    # a full 5000 post page can take a while to generate
+    response = http_client.post(
+        graphql_url,
+        json={'query': forum_query % terms},
+        timeout=(10, 180),
+    )
     response_json = response.json()
     return response_json
 
-def refresh_forum_data():
+def get_posts(after=None):
 
     offset = 0
-    forum_data = get_forum_data(offset)
+    forum_data = get_forum_data(offset, after)
 
     # the graphql only returns 5000 results at a time
     # so keep increment offset by 5000 until all data collected
     n_results = len(forum_data['data']['posts']['results'])
     while n_results == 5000:
         offset += 5000
-        offset_forum_data = get_forum_data(offset)
+        offset_forum_data = get_forum_data(offset, after)
         n_results = len(offset_forum_data['data']['posts']['results'])
 
         forum_data['data']['posts']['results'].extend(
             offset_forum_data['data']['posts']['results']
         )
 
-    with open('./assets/data/ea_forum.json', 'w') as f:
+    return forum_data
+
+def read_forum_data():
+    if not os.path.exists(FORUM_DATA_PATH):
+        return None
+    with open(FORUM_DATA_PATH, 'r') as f:
+        return json.load(f)
+
+def merge_posts(stored_posts, new_posts):
+    # pageUrl is unique per post, so newer copies of a post replace older ones
+    posts_by_url = { post['pageUrl']: post for post in stored_posts }
+    for post in new_posts:
+        posts_by_url[post['pageUrl']] = post
+    return sorted(
+        posts_by_url.values(),
+        key=lambda post: post['postedAt'] or '',
+        reverse=True,
+    )
+
+def fetch_forum_data(incremental=True, trailing_days=TRAILING_WINDOW_DAYS):
+
+    forum_data = read_forum_data() if incremental else None
+    if forum_data is None:
+        return get_posts()
+
+    stored_posts = forum_data['data']['posts']['results']
+    posted_ats = [ post['postedAt'] for post in stored_posts if post['postedAt'] ]
+    if not posted_ats:
+        return get_posts()
+
+    # Ask only for posts newer than the newest one we have, reaching back far
+    # enough to also pick up fresh karma and comment counts on recent posts
+    newest = max(posted_ats)
+    window_start = datetime.now(timezone.utc) - timedelta(days=trailing_days)
+    window_start = window_start.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+    after = min(newest, window_start)
+
+    new_posts = get_posts(after)['data']['posts']['results']
+    print(f'Merging {len(new_posts)} posts since {after} into {len(stored_posts)} stored posts')
+
+    forum_data['data']['posts']['results'] = merge_posts(stored_posts, new_posts)
+    return forum_data
+
+def write_forum_data(forum_data):
+    with atomic_write(FORUM_DATA_PATH) as f:
         f.write(json.dumps(forum_data))
+
+def refresh_forum_data(incremental=True, trailing_days=TRAILING_WINDOW_DAYS):
+    write_forum_data(fetch_forum_data(incremental, trailing_days))
@@ -1,12 +1,16 @@
-import requests
+from utils.get_data import http_client
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from utils.get_data.atomic import atomic_write
 
 NEW_PLEDGES_URL = 'https://dashboard.effectivealtruism.org/api/public/card/a8499095-be16-46fe-af1f-e3e56ee04e88/query?parameters=%5B%5D'
 DONATIONS_BY_YEAR_URL = 'https://dashboard.effectivealtruism.org/api/public/card/9906735e-1350-4353-9828-bb3ec16137e3/query?parameters=%5B%5D'
 DONATIONS_BY_ORG_URL = 'https://dashboard.effectivealtruism.org/api/public/card/b3887098-686a-491c-9f9c-9a5b0e2b7fd8/query?parameters=%5B%5D'
 
+GWWC_DATA_DIR = './assets/data/gwwc'
+
 def request_data_and_parse(url):
-    json_response = requests.get(url).json()
+    json_response = http_client.get(url).json()
     col_data = json_response['data']['cols']
     col_names = [ col_details['name'] for col_details in col_data ]
     data = json_response['data']['rows']
@@ -25,15 +29,23 @@ def get_donations_by_org():
     df = request_data_and_parse(DONATIONS_BY_ORG_URL)
     return df
 
-def save_data():
-    print('requesting new_pledges...')
-    new_pledges = get_new_pledges()
-    new_pledges.to_json('./assets/data/gwwc/new_pledges.json')
+def fetch_data():
+    getters = {
+        'new_pledges': get_new_pledges,
+        'donations_by_year': get_donations_by_year,
+        'donations_by_org': get_donations_by_org,
+    }
 
-    print('requesting donations_by_year...')
-    donations_by_year = get_donations_by_year()
-    donations_by_year.to_json('./assets/data/gwwc/donations_by_year.json')
+    # The three cards are independent, so request them all at once
+    print('requesting new_pledges, donations_by_year, donations_by_org...')
+    with ThreadPoolExecutor(max_workers=len(getters)) as executor:
+        futures = { name: executor.submit(getter) for name, getter in getters.items() }
+        return { name: future.result() for name, future in futures.items() }
 
-    print('requesting donations_by_org...')
-    donations_by_org = get_donations_by_org()
-    donations_by_org.to_json('./assets/data/gwwc/donations_by_org.json')
+def write_data(data):
+    for name, df in data.items():
+        with atomic_write(f'{GWWC_DATA_DIR}/{name}.json') as f:
+            df.to_json(f)
+
+def save_data():
+    write_data(fetch_data())
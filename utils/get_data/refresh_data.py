@@ -1,13 +1,166 @@
 import utils.get_data.data_scraping as data_scraping
+import utils.get_data.open_phil as open_phil
+import utils.get_data.query_forum as query_forum
+import utils.get_data.query_gwwc as query_gwwc
+from utils.get_data.data_version import read_data_version, bump_data_version
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
 import os
+import threading
 import time
 
+# fcntl is unix only; elsewhere every process refreshes for itself
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Every source is a (fetch, write) pair. The fetches all run at once, each
+# on its own thread; each result is written from the calling thread only if it
+# arrives before the source's deadline, so a slow or failed source never
+# leaves a half-written file in assets/data.
+SOURCES = {
+    'gwwc': (query_gwwc.fetch_data, query_gwwc.write_data),
+    'forum': (query_forum.fetch_forum_data, query_forum.write_forum_data),
+    'open_phil': (open_phil.download_grants, open_phil.write_grants),
+    'ea_funds': (data_scraping.download_ea_funds_grants, data_scraping.write_ea_funds_grants),
+    'ea_funds_balances': (data_scraping.download_ea_funds_balances, data_scraping.write_ea_funds_balances),
+    'founders_pledge': (data_scraping.scrape_founders_pledge, data_scraping.write_founders_pledge),
+}
+
+# Seconds after the start of the refresh by which each source must have arrived
+DEADLINES = {
+    'gwwc': 60,
+    'forum': 5*60,
+    'open_phil': 2*60,
+    'ea_funds': 60,
+    'ea_funds_balances': 60,
+    'founders_pledge': 60,
+}
+
+REFRESH_INTERVAL = 60*60
+
+# Held by whichever worker is fetching. Its mtime records the last attempt,
+# so the hourly guard is shared by every worker on the machine.
+REFRESH_LOCK_PATH = './assets/data/.refresh.lock'
+
 most_recent_refresh = None
 
+def fetch_in_background(fetch):
+    # A daemon thread rather than a ThreadPoolExecutor, whose threads are
+    # joined at exit: `python -m utils.get_data.refresh_data` would otherwise
+    # hang on a fetch that already missed its deadline
+    future = Future()
+
+    def run():
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(fetch())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+def refresh_sources(sources=SOURCES, deadlines=DEADLINES):
+
+    start = time.time()
+    futures = {
+        name: fetch_in_background(fetch)
+        for name, (fetch, write) in sources.items()
+    }
+
+    statuses = {}
+    for name in sorted(futures, key=lambda name: deadlines[name]):
+        fetch, write = sources[name]
+        remaining = start + deadlines[name] - time.time()
+        try:
+            data = futures[name].result(timeout=max(remaining, 0))
+            if data is None or write(data) is False:
+                statuses[name] = 'failed'
+            else:
+                statuses[name] = 'ok'
+        except FutureTimeoutError:
+            print(f'{name} missed its {deadlines[name]}s deadline')
+            statuses[name] = 'timeout'
+        except Exception as e:
+            print(f'Error refreshing {name}: {e}')
+            statuses[name] = 'failed'
+
+    print(f'Refreshed data in {time.time()-start:.1f}s: {statuses}')
+    return statuses
+
+@contextmanager
+def refresh_lock():
+    with open(REFRESH_LOCK_PATH, 'a') as lock_file:
+        if fcntl is None:
+            yield True
+            return
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
 def refresh_data():
     global most_recent_refresh
-    if most_recent_refresh and time.time() - most_recent_refresh < 60*60:
+    if most_recent_refresh and time.time() - most_recent_refresh < REFRESH_INTERVAL:
         return
     most_recent_refresh = time.time()
 
+    first_refresh = not os.path.exists(REFRESH_LOCK_PATH)
+    with refresh_lock() as acquired:
+
+        # Another worker is already fetching
+        if not acquired:
+            return
+
+        # Another worker may have fetched since this one last checked
+        if not first_refresh and time.time() - os.path.getmtime(REFRESH_LOCK_PATH) < REFRESH_INTERVAL:
+            return
+        os.utime(REFRESH_LOCK_PATH)
+
+        statuses = refresh_sources()
+        if 'ok' in statuses.values():
+            bump_data_version()
+
+        return statuses
+
+def start_refresh_scheduler(on_new_version, fetch=True, poll_interval=60):
+    '''
+    Straight away and then every poll_interval seconds, refresh the data if
+    this worker wins the refresh lock (and fetch is set), then call
+    on_new_version(version) if any worker has written a new data version
+    since the last poll.
+    '''
+
+    def poll():
+        version = read_data_version()
+        while True:
+            if fetch:
+                try:
+                    refresh_data()
+                except Exception as e:
+                    print(f'Error refreshing data: {e}')
+
+            new_version = read_data_version()
+            if new_version != version:
+                version = new_version
+                try:
+                    on_new_version(version)
+                except Exception as e:
+                    print(f'Error loading data version {version}: {e}')
+
+            time.sleep(poll_interval)
+
+    thread = threading.Thread(target=poll, daemon=True)
+    thread.start()
+    return thread
 
+if __name__ == '__main__':
+    refresh_data()
@@ -0,0 +1 @@
+from utils.get_data.stand_in.server import StandIn, StandInServer
@@ -0,0 +1,32 @@
+# Serve every upstream data source locally, e.g.
+#
+#   python -m utils.get_data.stand_in --forum-posts 200000 --grants 100000 --latency 0.2
+#
+# then point the fetchers at it:
+#
+#   EADATA_UPSTREAM_URL=http://127.0.0.1:8000 python -m utils.get_data.refresh_data
+
+import argparse
+from utils.get_data.stand_in import StandIn, StandInServer
+
+parser = argparse.ArgumentParser(description='Offline stand-in for the upstream data sources.')
+parser.add_argument('--host', default='127.0.0.1')
+parser.add_argument('--port', type=int, default=8000)
+parser.add_argument('--latency', type=float, default=0.0, help='seconds to wait before each response')
+parser.add_argument('--forum-posts', type=int, help='synthesize this many forum posts instead of replaying ea_forum.json')
+parser.add_argument('--grants', type=int, help='synthesize this many Open Phil grants instead of replaying openphil_grants.csv')
+parser.add_argument('--fund-grants', type=int, help='synthesize this many grants per EA Fund instead of replaying ea_funds_grants.csv')
+parser.add_argument('--seed', type=int, default=0)
+parser.add_argument('--verbose', action='store_true', help='log every request')
+args = parser.parse_args()
+
+stand_in = StandIn(
+    forum_posts=args.forum_posts,
+    grants=args.grants,
+    fund_grants=args.fund_grants,
+    latency=args.latency,
+    seed=args.seed,
+)
+server = StandInServer((args.host, args.port), stand_in, verbose=args.verbose)
+print(f'Serving stand-in upstream at {server.url}')
+server.serve_forever()
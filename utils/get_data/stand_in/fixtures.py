@@ -0,0 +1,198 @@
+import csv
+import json
+import random
+import re
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+
+import pandas as pd
+
+from utils.get_data import query_gwwc
+from utils.get_data.data_scraping import EA_FUND_NAMES, EA_FUNDS_GRANTS_PATH
+from utils.get_data.open_phil import OP_GRANTS_PATH
+from utils.get_data.query_forum import FORUM_DATA_PATH
+
+# Response bodies for the stand-in server. Each source is either replayed
+# from the snapshot in assets/data or, given a size, synthesized.
+
+FIRST_POST_DATE = datetime(2011, 11, 1, tzinfo=timezone.utc)
+
+FOCUS_AREAS = [
+    'Global Health & Development',
+    'Farm Animal Welfare',
+    'Potential Risks from Advanced Artificial Intelligence',
+    'Biosecurity and Pandemic Preparedness',
+    'Criminal Justice Reform',
+    'Scientific Research',
+    'Effective Altruism Community Growth',
+]
+
+def iso_timestamp(date):
+    return date.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+# EA Forum
+
+def recorded_posts():
+    with open(FORUM_DATA_PATH, 'r') as f:
+        return json.load(f)['data']['posts']['results']
+
+def synthetic_posts(n_posts, seed=0):
+    rng = random.Random(seed)
+    span = (datetime.now(timezone.utc) - FIRST_POST_DATE).total_seconds()
+    n_users = max(n_posts // 10, 1)
+
+    def user():
+        i = rng.randrange(n_users)
+        return {'username': f'user_{i}', 'displayName': f'User {i}'}
+
+    posts = []
+    for i in range(n_posts):
+        posted_at = FIRST_POST_DATE + timedelta(seconds=span * i / n_posts)
+        posts.append({
+            'title': f'Synthetic post {i}',
+            'postedAt': iso_timestamp(posted_at),
+            'user': user() if rng.random() > 0.002 else None,
+            'coauthors': [ user() for _ in range(rng.random() < 0.1) ],
+            'pageUrl': f'https://forum.effectivealtruism.org/posts/synthetic{i}/synthetic-post-{i}',
+            'wordCount': rng.randint(0, 8000) if rng.random() > 0.25 else None,
+            'baseScore': int(rng.expovariate(1 / 25)) - 5,
+            'commentCount': rng.randint(0, 80) if rng.random() > 0.25 else None,
+        })
+
+    # the forum lists newest first
+    posts.reverse()
+    return posts
+
+def forum_page(posts, query):
+    terms = re.search(r'terms:\s*{([^}]*)}', query).group(1)
+    offset = re.search(r'offset:\s*(\d+)', terms)
+    offset = int(offset.group(1)) if offset else 0
+    after = re.search(r'after:\s*"([^"]*)"', terms)
+    if after:
+        posts = [ post for post in posts if (post['postedAt'] or '') > after.group(1) ]
+    return {'data': {'posts': {'results': posts[offset:offset+5000]}}}
+
+
+# Open Philanthropy
+
+def recorded_grants_csv():
+    with open(OP_GRANTS_PATH, 'r') as f:
+        return f.read()
+
+def synthetic_grants_csv(n_grants, seed=0):
+    rng = random.Random(seed)
+    n_orgs = max(n_grants // 5, 1)
+    months = pd.date_range('2012-01-01', datetime.now(), freq='MS')
+
+    out = StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['Grant', 'Organization Name', 'Focus Area', 'Amount', 'Date'])
+    for i in range(n_grants):
+        org = f'Organization {rng.randrange(n_orgs)}'
+        writer.writerow([
+            f'{org} — Synthetic Grant {i}',
+            org,
+            rng.choice(FOCUS_AREAS),
+            f'${int(rng.lognormvariate(12, 1.5)):,}',
+            rng.choice(months).strftime('%B %Y'),
+        ])
+    return out.getvalue()
+
+
+# Giving What We Can (Metabase public cards)
+
+GWWC_CARDS = {
+    re.search(r'card/([0-9a-f-]+)/', url).group(1): name
+    for url, name in [
+        (query_gwwc.NEW_PLEDGES_URL, 'new_pledges'),
+        (query_gwwc.DONATIONS_BY_YEAR_URL, 'donations_by_year'),
+        (query_gwwc.DONATIONS_BY_ORG_URL, 'donations_by_org'),
+    ]
+}
+
+def recorded_gwwc_card(name):
+    df = pd.read_json(f'{query_gwwc.GWWC_DATA_DIR}/{name}.json', convert_dates=False)
+    return {
+        'data': {
+            'cols': [ {'name': col} for col in df.columns ],
+            'rows': json.loads(df.to_json(orient='values')),
+        }
+    }
+
+
+# EA Funds payout reports (Contentful)
+
+def recorded_fund_grants():
+    grants = pd.read_csv(EA_FUNDS_GRANTS_PATH)
+    return {
+        fund_name: [
+            {'fields': {'title': title, 'amount': int(amount), 'date': str(date)[:10]}}
+            for title, amount, date in zip(fund['title'], fund['amount'], fund['date'])
+        ]
+        for fund_name, fund in grants.groupby('fund')
+    }
+
+def synthetic_fund_grants(n_grants, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2017, 1, 1)
+    span = (datetime.now() - start).days
+    return {
+        fund_name: [
+            {
+                'fields': {
+                    'title': f'Synthetic {fund_name} grant {i}',
+                    'amount': int(rng.lognormvariate(10, 1.5)),
+                    'date': (start + timedelta(days=rng.randrange(span))).strftime('%Y-%m-%d'),
+                }
+            }
+            for i in range(n_grants)
+        ]
+        for fund_name in EA_FUND_NAMES
+    }
+
+def contentful_page(fund_grants, params):
+    items = fund_grants.get(params.get('fields.fund.fields.slug'), [])
+    items = sorted(items, key=lambda item: item['fields']['date'], reverse=True)
+    skip = int(params.get('skip', 0))
+    limit = int(params.get('limit', 100))
+    return {
+        'total': len(items),
+        'skip': skip,
+        'limit': limit,
+        'items': items[skip:skip+limit],
+    }
+
+
+# EA Funds balances (parfit GraphQL)
+
+def balances_response(body):
+    report_date = body['variables'].get('nearestReportDate') or iso_timestamp(datetime.now(timezone.utc))
+    data = {}
+    for alias, reference in body['variables'].items():
+        if alias == 'nearestReportDate':
+            continue
+        data[alias] = {
+            'edges': [
+                {
+                    'node': {
+                        'reportDate': report_date[:10],
+                        'reference': reference,
+                        'amount': round(random.Random(reference).uniform(1e5, 1e7), 2),
+                    }
+                }
+            ]
+        }
+    return {'data': data}
+
+
+# Founders Pledge
+
+FOUNDERS_PLEDGE_HTML = '''<html>
+<body>
+  <div class="resource--stat--total-value-pledged">$7.50 billion pledged</div>
+  <div class="resource--stat--fulfilled-commitments">$850 million in fulfilled commitments</div>
+  <div class="resource--stat--in-30-countries">1700 members In 30 Countries</div>
+</body>
+</html>
+'''
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+from utils.get_data.stand_in import fixtures
+
+class StandIn:
+    '''
+    Answers requests for every upstream data source, addressed as
+    /<original host>/<original path>. Sources are replayed from the
+    snapshot in assets/data unless a synthetic size is given.
+    '''
+
+    def __init__(self, forum_posts=None, grants=None, fund_grants=None, latency=0.0, seed=0):
+        self.latency = latency
+
+        if forum_posts:
+            self.posts = fixtures.synthetic_posts(forum_posts, seed)
+        else:
+            self.posts = fixtures.recorded_posts()
+
+        if grants:
+            self.grants_csv = fixtures.synthetic_grants_csv(grants, seed)
+        else:
+            self.grants_csv = fixtures.recorded_grants_csv()
+
+        if fund_grants:
+            self.fund_grants = fixtures.synthetic_fund_grants(fund_grants, seed)
+        else:
+            self.fund_grants = fixtures.recorded_fund_grants()
+
+        self.gwwc_cards = {
+            card_id: fixtures.recorded_gwwc_card(name)
+            for card_id, name in fixtures.GWWC_CARDS.items()
+        }
+
+    def respond(self, method, url, body):
+        # returns (status, content type, body bytes)
+        parts = urlsplit(url)
+        host, _, path = parts.path.lstrip('/').partition('/')
+        params = dict(parse_qsl(parts.query))
+
+        if method == 'POST':
+            body = json.loads(body or b'{}')
+
+            if host == 'forum.effectivealtruism.org' and path == 'graphql':
+                return as_json(fixtures.forum_page(self.posts, body['query']))
+
+            if host == 'parfit.effectivealtruism.org' and path == 'graphql':
+                return as_json(fixtures.balances_response(body))
+
+        if method == 'GET':
+
+            if host == 'www.openphilanthropy.org' and path == 'wp-admin/admin-ajax.php':
+                return 200, 'text/csv; charset=utf-8', self.grants_csv.encode()
+
+            card = re.fullmatch(r'api/public/card/([0-9a-f-]+)/query', path)
+            if host == 'dashboard.effectivealtruism.org' and card and card.group(1) in self.gwwc_cards:
+                return as_json(self.gwwc_cards[card.group(1)])
+
+            if host == 'cdn.contentful.com' and re.fullmatch(r'spaces/[^/]+/entries', path):
+                return as_json(fixtures.contentful_page(self.fund_grants, params))
+
+            if host == 'founderspledge.com' and path in ('', '/'):
+                return 200, 'text/html; charset=utf-8', fixtures.FOUNDERS_PLEDGE_HTML.encode()
+
+        return 404, 'text/plain', f'No stand-in for {method} {url}'.encode()
+
+def as_json(data):
+    return 200, 'application/json', json.dumps(data).encode()
+
+class StandInHandler(BaseHTTPRequestHandler):
+
+    # keep-alive, so the fetchers' connection pooling is exercised too
+    protocol_version = 'HTTP/1.1'
+
+    def handle_request(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        stand_in = self.server.stand_in
+        if stand_in.latency:
+            time.sleep(stand_in.latency)
+
+        status, content_type, content = stand_in.respond(method, self.path, body)
+
+        # Tag GET responses so conditional requests can come back as 304s
+        etag = None
+        if method == 'GET' and status == 200:
+            etag = '"' + hashlib.sha1(content).hexdigest() + '"'
+            if self.headers.get('If-None-Match') == etag:
+                status, content = 304, b''
+
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+        if status != 304:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class StandInServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, address, stand_in, verbose=False):
+        super().__init__(address, StandInHandler)
+        self.stand_in = stand_in
+        self.verbose = verbose
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
@@ -0,0 +1,110 @@
+import re
+from string import Formatter
+
+import numpy as np
+import pandas as pd
+
+# Builds a column of hover or label text from a template in str.format
+# syntax, where every field is a column name, e.g.
+#   hover_text(df, '<b>{Country}</b><br>{Responses:,.0f} responses')
+# Fields are formatted a whole column at a time. Supported format specs are
+# '', strftime patterns for dates ('%B %Y'), and numbers with an optional
+# thousands separator and precision (',', '.1f', ',.2f').
+
+NUMBER_SPEC = re.compile(r'(?P<comma>,)?(?:\.(?P<precision>\d+)f)?d?')
+
+def add_thousands_separators(texts):
+    parts = texts.str.partition('.')
+    integer = parts[0].str.replace(r'(\d)(?=(\d{3})+$)', r'\1,', regex=True)
+    return integer + parts[1] + parts[2]
+
+def format_column(series, spec=''):
+
+    if not spec:
+        return series.astype(str)
+
+    if '%' in spec:
+        # e.g. '{share:.1%}' would otherwise be read as a date pattern
+        if pd.api.types.is_numeric_dtype(series):
+            raise ValueError(f'Unsupported format spec for numbers: {spec!r}')
+        return pd.to_datetime(series).dt.strftime(spec)
+
+    match = NUMBER_SPEC.fullmatch(spec)
+    if not match:
+        raise ValueError(f'Unsupported format spec: {spec!r}')
+
+    if match['precision'] is not None:
+        texts = np.char.mod(f'%.{match["precision"]}f', series.to_numpy(dtype=float))
+        texts = pd.Series(texts, index=series.index, dtype=object)
+    else:
+        texts = series.astype(str)
+
+    if match['comma']:
+        texts = add_thousands_separators(texts)
+
+    return texts
+
+def template_columns(template):
+    return [ field for _, field, _, _ in Formatter().parse(template) if field is not None ]
+
+def hover_text(df, template):
+
+    result = pd.Series('', index=df.index, dtype=object)
+
+    for literal, field, spec, conversion in Formatter().parse(template):
+        if literal:
+            result = result + literal
+        if field is None:
+            continue
+        if conversion:
+            raise ValueError(f'Unsupported conversion in {template!r}')
+        result = result + format_column(df[field], spec)
+
+    return result
+
+# The same templates can instead be rendered in the browser: the raw
+# columns go to Plotly as customdata and the template becomes a Plotly
+# hovertemplate. Number specs carry over unchanged, since d3-format reads
+# them the same way. Dates are formatted here, as the browser would parse
+# them first anyway. A formatted field that is also the trace's x or y
+# (given by axes, column -> 'x' or 'y') is read from the trace itself.
+
+def plotly_hover_template(template, axes={}):
+
+    parts = []
+    fields = []
+
+    for literal, field, spec, conversion in Formatter().parse(template):
+        parts.append(literal)
+        if field is None:
+            continue
+        if conversion:
+            raise ValueError(f'Unsupported conversion in {template!r}')
+
+        is_date = '%' in spec
+        if spec and not is_date and not NUMBER_SPEC.fullmatch(spec):
+            raise ValueError(f'Unsupported format spec: {spec!r}')
+
+        if spec and field in axes:
+            separator = '|' if is_date else ':'
+            parts.append('%{' + axes[field] + separator + spec + '}')
+            continue
+
+        data_field = (field, spec if is_date else '')
+        if data_field not in fields:
+            fields.append(data_field)
+        index = fields.index(data_field)
+        if spec and not is_date:
+            parts.append(f'%{{customdata[{index}]:{spec}}}')
+        else:
+            parts.append(f'%{{customdata[{index}]}}')
+
+    return ''.join(parts) + '<extra></extra>', fields
+
+def hover_customdata(df, fields):
+    if not fields:
+        return None
+    return np.column_stack([
+        format_column(df[field], spec).to_numpy() if spec else df[field].to_numpy()
+        for field, spec in fields
+    ])
@@ -3,60 +3,84 @@ from dash import dcc
 from dash import html
 import plotly.graph_objects as go
 import plotly.express as px
+from utils.hover import plotly_hover_template, hover_customdata
+from utils.plots.serialize import figure_json
+from utils.plots.figure_cache import cached_figure
 
-class Bar(dcc.Graph):
+def bar_figure(df, height=None, title=None, hover_template=None):
 
-    def __init__(self, df, height=None, title=None):
+    if 'text' in df.columns:
+        text_col = 'text'
+    else:
+        text_col = 'y'
 
-        if 'text' in df.columns:
-            text_col = 'text'
-        else:
-            text_col = 'y'
+    if 'hover' in df.columns:
+        hover_col = 'hover'
+    else:
+        hover_col = 'x'
 
-        if 'hover' in df.columns:
-            hover_col = 'hover'
-        else:
-            hover_col = 'x'
+    bar = px.bar(
+        df,
+        y='x',
+        x='y',
+        text=text_col,
+        title=title,
+        height=height,
+        orientation='h',
+    )
 
-        self.bar = px.bar(
-            df,
-            y='x',
-            x='y',
-            text=text_col,
-            title=title,
-            height=height,
-            orientation='h',
-        )
+    bar.update_traces(
+        marker_color="#0c869b",
+    )
 
-        self.bar.update_traces(
-            marker_color="#0c869b",
+    # Bars are horizontal, so the df's x column is plotted on the y axis
+    if hover_template:
+        hovertemplate, fields = plotly_hover_template(hover_template, axes={'x': 'y', 'y': 'x'})
+        bar.update_traces(
+            customdata = hover_customdata(df, fields),
+            hovertemplate = hovertemplate,
+        )
+    else:
+        bar.update_traces(
             hovertext = df[hover_col],
             hovertemplate = '%{hovertext}<extra></extra>',
         )
 
-        self.bar.update_xaxes(side='top')
+    bar.update_xaxes(side='top')
 
-        self.bar.update_layout(
-            margin=dict(l=0, r=0, t=30, b=0),
-            xaxis=dict(
-                title='',
-                fixedrange=True
-            ),
-            yaxis=dict(
-                title='',
-                # dtick=1,
-                fixedrange=True
-            ),
-            title_x=0.5,
-            font=dict(
-                family="Raleway",
-                size=12,
-            )
+    bar.update_layout(
+        margin=dict(l=0, r=0, t=30, b=0),
+        xaxis=dict(
+            title='',
+            fixedrange=True
+        ),
+        yaxis=dict(
+            title='',
+            # dtick=1,
+            fixedrange=True
+        ),
+        title_x=0.5,
+        font=dict(
+            family="Raleway",
+            size=12,
         )
+    )
+
+    return figure_json(bar)
+
+class Bar(dcc.Graph):
+
+    def __init__(self, df, height=None, title=None, hover_template=None):
 
         super().__init__(
             id=title,
-            figure=self.bar,
+            figure=cached_figure(
+                bar_figure,
+                df,
+                height=height,
+                title=title,
+                hover_template=hover_template,
+            ),
             responsive=True,
             config={
                 'displayModeBar': False,
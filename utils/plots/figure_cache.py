@@ -0,0 +1,169 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from plotly.io.json import to_json_plotly
+
+from utils.get_data.atomic import atomic_write
+from utils.get_data.data_version import read_data_version
+from utils.plots.serialize import FIGURE_ENCODING
+from utils.data_cache import source_hash
+
+# Built figures are memoized by (data version, builder, arguments), first in
+# an LRU in each process and then, if EADATA_FIGURE_CACHE_DIR is set, as
+# JSON files shared by every worker, so a layout rebuilt from unchanged data
+# reuses the figure instead of building it again with Plotly.
+#
+# Arguments are fingerprinted by value, DataFrames included, so a figure
+# is never served for data it wasn't built from, even by the disk tier
+# after the data changed without a new data version.
+FIGURE_CACHE_SIZE = int(os.environ.get('EADATA_FIGURE_CACHE_SIZE', 256))
+FIGURE_CACHE_DIR = os.environ.get('EADATA_FIGURE_CACHE_DIR')
+
+# Cached figures from older data versions kept on disk
+VERSIONS_KEPT = 2
+
+# Figures change with the code building them, in the sections as well as
+# the plots, and with the encoding, not only with their inputs
+FIGURE_CODE = source_hash(['components', 'utils']) + FIGURE_ENCODING
+
+figure_cache = OrderedDict()
+figure_cache_lock = threading.Lock()
+
+# Data version of the section being rendered by this thread, read once
+# per render rather than once per figure
+render_scope = threading.local()
+
+@contextmanager
+def figure_scope(version):
+    render_scope.version = version
+    try:
+        yield
+    finally:
+        render_scope.version = None
+
+def update_fingerprint(sha1, value):
+
+    if isinstance(value, pd.DataFrame):
+        sha1.update(b'DataFrame')
+        sha1.update(repr(list(value.index.names)).encode())
+        for col in value.columns:
+            sha1.update(repr(col).encode())
+            update_fingerprint(sha1, value[col])
+        return
+
+    if isinstance(value, pd.Series):
+        sha1.update(str(value.dtype).encode())
+        try:
+            hashes = pd.util.hash_pandas_object(value, index=True)
+        except TypeError:
+            # e.g. lists in an object column
+            hashes = pd.util.hash_pandas_object(value.astype(str), index=True)
+        sha1.update(hashes.to_numpy().tobytes())
+        return
+
+    if isinstance(value, np.ndarray):
+        update_fingerprint(sha1, pd.Series(value.ravel()))
+        sha1.update(repr(value.shape).encode())
+        return
+
+    if isinstance(value, dict):
+        sha1.update(b'dict')
+        for key in sorted(value, key=repr):
+            sha1.update(repr(key).encode())
+            update_fingerprint(sha1, value[key])
+        return
+
+    if isinstance(value, (list, tuple)):
+        sha1.update(type(value).__name__.encode())
+        for item in value:
+            update_fingerprint(sha1, item)
+        return
+
+    sha1.update(repr(value).encode())
+
+def figure_key(builder, args, kwargs):
+    # Defaults are filled in, so Bar(df) and Bar(df, title=None) match
+    arguments = inspect.signature(builder).bind(*args, **kwargs)
+    arguments.apply_defaults()
+
+    sha1 = hashlib.sha1()
+    sha1.update(f'{builder.__module__}.{builder.__qualname__}'.encode())
+    sha1.update(FIGURE_CODE.encode())
+    update_fingerprint(sha1, dict(arguments.arguments))
+    return sha1.hexdigest()
+
+def figure_path(version, key):
+    return os.path.join(FIGURE_CACHE_DIR, version, f'{key}.json')
+
+def read_cached_figure(version, key):
+    try:
+        with open(figure_path(version, key), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_cached_figure(version, key, figure):
+    new_version = not os.path.exists(os.path.join(FIGURE_CACHE_DIR, version))
+    try:
+        with atomic_write(figure_path(version, key)) as f:
+            f.write(to_json_plotly(figure))
+    except Exception as e:
+        print(f'Could not write cached figure {key}: {e}')
+    if new_version:
+        prune_versions(keep=version)
+
+def prune_versions(keep):
+    versions = sorted(
+        (
+            name for name in os.listdir(FIGURE_CACHE_DIR)
+            if name != keep and os.path.isdir(os.path.join(FIGURE_CACHE_DIR, name))
+        ),
+        key=lambda name: os.path.getmtime(os.path.join(FIGURE_CACHE_DIR, name)),
+    )
+    for name in versions[:max(len(versions) - VERSIONS_KEPT, 0)]:
+        shutil.rmtree(os.path.join(FIGURE_CACHE_DIR, name), ignore_errors=True)
+
+def copy_figure(obj):
+    # Copies every dict, list and array; what they hold is immutable
+    if isinstance(obj, dict):
+        return { key: copy_figure(value) for key, value in obj.items() }
+    if isinstance(obj, (list, tuple)):
+        return [ copy_figure(value) for value in obj ]
+    if isinstance(obj, np.ndarray):
+        return obj.copy()
+    return obj
+
+def cached_figure(builder, *args, **kwargs):
+    '''
+    builder(*args, **kwargs), memoized. Each call gets its own copy, so
+    callers may modify the result.
+    '''
+
+    version = getattr(render_scope, 'version', None) or read_data_version()
+    key = (version, figure_key(builder, args, kwargs))
+
+    with figure_cache_lock:
+        if key in figure_cache:
+            figure_cache.move_to_end(key)
+            return copy_figure(figure_cache[key])
+
+    figure = read_cached_figure(*key) if FIGURE_CACHE_DIR else None
+    if figure is None:
+        figure = builder(*args, **kwargs)
+        if FIGURE_CACHE_DIR:
+            write_cached_figure(*key, figure)
+
+    with figure_cache_lock:
+        figure_cache[key] = figure
+        while len(figure_cache) > FIGURE_CACHE_SIZE:
+            figure_cache.popitem(last=False)
+
+    return copy_figure(figure)
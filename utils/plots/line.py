@@ -2,6 +2,116 @@ import plotly.express as px
 import plotly.graph_objects as go
 from dash import dcc
 from dash import html
+from utils.hover import plotly_hover_template, hover_customdata
+from utils.plots.serialize import figure_json
+from utils.plots.figure_cache import cached_figure
+
+def line_figure(
+    df,
+    x='x',
+    y='y',
+    label='label',
+    hover='hover',
+    hover_template=None,
+    title=None,
+    x_title='',
+    y_title='',
+    size=None,
+    color=None,
+    log_y=False,
+    dollars=False,
+    xanchor='right',
+    yanchor='bottom',
+):
+
+    fig = go.Figure()
+
+    if hover_template:
+        hovertemplate, fields = plotly_hover_template(hover_template, axes={x: 'x', y: 'y'})
+
+    def hover_args(hover_df):
+        # Either raw fields formatted by the browser, or finished strings
+        if hover_template:
+            return dict(
+                customdata = hover_customdata(hover_df, fields),
+                hovertemplate = hovertemplate,
+            )
+        return dict(
+            hovertext = hover_df[hover],
+            hovertemplate = '%{hovertext}<extra></extra>',
+        )
+
+    annotations = []
+    for val in df[label].unique():
+
+        val_df = df.loc[ df[label]==val ]
+        val_df = val_df.sort_values(by=[x,y])
+
+        fig.add_trace(
+            go.Scatter(
+                x=val_df[x],
+                y=val_df[y],
+                name=val,
+                mode='lines',
+                line=dict(
+                    color="#0c869b",
+                ),
+                **hover_args(val_df),
+            )
+        )
+
+        val_df = val_df.loc[ val_df[y].notnull() ].reset_index()
+        last_row = val_df.iloc[len(val_df)-1]
+
+        fig.add_trace(go.Scatter(
+            x=[ last_row[x] ],
+            y=[ last_row[y] ],
+            mode='markers',
+            marker=dict(
+                color="#0c869b",
+                size=10,
+            ),
+            **hover_args(val_df.iloc[[len(val_df)-1]]),
+        ))
+
+        annotations.append(dict(
+            x=last_row[x],
+            y=last_row[y],
+            xanchor=xanchor,
+            yanchor=yanchor,
+            text=f' {val}',
+            font={
+                'size': 13,
+            },
+            showarrow=False,
+        ))
+
+    if log_y:
+        fig.update_layout(
+            yaxis_type="log",
+        )
+
+    if dollars:
+        fig.update_layout(
+            yaxis_tickprefix = '$',
+        )
+
+    top_margin = 40 if title else 0
+    fig.update_layout(
+        title=title,
+        showlegend=False,
+        xaxis = dict(
+            title = x_title,
+        ),
+        yaxis = dict(
+            title = y_title,
+        ),
+        annotations=annotations,
+        margin=dict(l=0, r=0, t=top_margin, b=0),
+        title_x=0.5,
+    )
+
+    return figure_json(fig)
 
 class Line(dcc.Graph):
 
@@ -12,6 +122,7 @@ class Line(dcc.Graph):
         y='y',
         label='label',
         hover='hover',
+        hover_template=None,
         title=None,
         x_title='',
         y_title='',
@@ -23,83 +134,24 @@ class Line(dcc.Graph):
         yanchor='bottom',
     ):
 
-        fig = go.Figure()
-
-        annotations = []
-        for val in df[label].unique():
-
-            val_df = df.loc[ df[label]==val ]
-            val_df = val_df.sort_values(by=[x,y])
-
-            fig.add_trace(
-                go.Scatter(
-                    x=val_df[x],
-                    y=val_df[y],
-                    name=val,
-                    hovertext = val_df[hover],
-                    hovertemplate = '%{hovertext}<extra></extra>',
-                    mode='lines',
-                    line=dict(
-                        color="#0c869b",
-                    ),
-                )
-            )
-
-            val_df = val_df.loc[ val_df[y].notnull() ].reset_index()
-            last_row = val_df.iloc[len(val_df)-1]
-            last_hover = last_row[hover]
-
-            fig.add_trace(go.Scatter(
-                x=[ last_row[x] ],
-                y=[ last_row[y] ],
-                mode='markers',
-                marker=dict(
-                    color="#0c869b",
-                    size=10,
-                ),
-                hovertext = [last_hover],
-                hovertemplate = '%{hovertext}<extra></extra>',
-            ))
-
-            annotations.append(dict(
-                x=last_row[x],
-                y=last_row[y],
+        super().__init__(
+            figure=cached_figure(
+                line_figure,
+                df,
+                x=x,
+                y=y,
+                label=label,
+                hover=hover,
+                hover_template=hover_template,
+                title=title,
+                x_title=x_title,
+                y_title=y_title,
+                size=size,
+                color=color,
+                log_y=log_y,
+                dollars=dollars,
                 xanchor=xanchor,
                 yanchor=yanchor,
-                text=f' {val}',
-                font={
-                    'size': 13,
-                },
-                showarrow=False,
-            ))
-
-        if log_y:
-            fig.update_layout(
-                yaxis_type="log",
-            )
-
-        if dollars:
-            fig.update_layout(
-                yaxis_tickprefix = '$',
-            )
-
-        top_margin = 40 if title else 0
-        fig.update_layout(
-            title=title,
-            showlegend=False,
-            xaxis = dict(
-                title = x_title,
             ),
-            yaxis = dict(
-                title = y_title,
-            ),
-            annotations=annotations,
-            margin=dict(l=0, r=0, t=top_margin, b=0),
-            title_x=0.5,
-        )
-
-        super().__init__(
-            figure=fig,
             responsive=True
         )
-
@@ -1,6 +1,74 @@
 import dash
 from dash import dcc
 import plotly.express as px
+from utils.hover import plotly_hover_template, hover_customdata
+from utils.plots.serialize import figure_json
+from utils.plots.figure_cache import cached_figure
+
+def scatter_figure(
+    df,
+    x='x',
+    y='y',
+    x_title='',
+    y_title='',
+    size=None,
+    color=None,
+    hover=None,
+    hover_template=None,
+    title=None,
+    text=None,
+    log_y=False,
+    transparent=True,
+):
+
+    fig = px.scatter(
+        df,
+        x = x,
+        y = y,
+        log_y = log_y,
+        title = title,
+        size = size,
+        color = color,
+        text = text,
+    )
+
+    fig.update_traces(
+        marker_color = 'rgba(12, 134, 155, 0.6)' if transparent else "#0c869b",
+    )
+
+    # Send the raw fields and let the browser format them, rather than
+    # sending a finished string for every point
+    if hover_template:
+        hovertemplate, fields = plotly_hover_template(hover_template, axes={x: 'x', y: 'y'})
+        fig.update_traces(
+            customdata = hover_customdata(df, fields),
+            hovertemplate = hovertemplate,
+        )
+    elif hover:
+        fig.update_traces(
+            hovertext = df[hover],
+            hovertemplate = '%{hovertext}<extra></extra>',
+        )
+
+    fig.update_layout(
+        margin = dict(l=0, r=0, t=30, b=0),
+        autosize = True,
+        xaxis = dict(
+            title = x_title,
+        ),
+        yaxis = dict(
+            title = y_title,
+        ),
+        title_x = 0.5,
+        font = dict(
+            family = "Raleway",
+            size = 12,
+        )
+    )
+
+    fig.update_traces(textposition="middle right")
+
+    return figure_json(fig)
 
 class Scatter(dcc.Graph):
 
@@ -14,52 +82,29 @@ class Scatter(dcc.Graph):
         size=None,
         color=None,
         hover=None,
+        hover_template=None,
         title=None,
         text=None,
         log_y=False,
         transparent=True,
     ):
 
-        fig = px.scatter(
-            df,
-            x = x,
-            y = y,
-            log_y = log_y,
-            title = title,
-            size = size,
-            color = color,
-            text = text,
-        )
-
-        fig.update_traces(
-            marker_color = 'rgba(12, 134, 155, 0.6)' if transparent else "#0c869b",
-        )
-
-        if hover:
-            fig.update_traces(
-                hovertext = df[hover],
-                hovertemplate = '%{hovertext}<extra></extra>',
-            )
-
-        fig.update_layout(
-            margin = dict(l=0, r=0, t=30, b=0),
-            autosize = True,
-            xaxis = dict(
-                title = x_title,
-            ),
-            yaxis = dict(
-                title = y_title,
-            ),
-            title_x = 0.5,
-            font = dict(
-                family = "Raleway",
-                size = 12,
-            )
-        )
-
-        fig.update_traces(textposition="middle right")
-
         super().__init__(
-            figure = fig,
+            figure = cached_figure(
+                scatter_figure,
+                df,
+                x = x,
+                y = y,
+                x_title = x_title,
+                y_title = y_title,
+                size = size,
+                color = color,
+                hover = hover,
+                hover_template = hover_template,
+                title = title,
+                text = text,
+                log_y = log_y,
+                transparent = transparent,
+            ),
             responsive = True,
         )
@@ -0,0 +1,99 @@
+import base64
+import os
+
+import numpy as np
+
+# How figures are sent to the browser. 'lists' sends numeric arrays as plain
+# JSON lists, which the plotly.js bundled with dash reads. 'typed' encodes
+# them as base64 typed arrays ({'dtype': 'f8', 'bdata': ...}), which are
+# smaller but need plotly.js v2.28 or later, so the app then also loads
+# PLOTLY_JS_URL from the CDN. Opt in with EADATA_FIGURE_ENCODING=typed.
+FIGURE_ENCODING = os.environ.get('EADATA_FIGURE_ENCODING', 'lists')
+
+PLOTLY_JS_URL = 'https://cdn.plot.ly/plotly-2.35.2.min.js'
+
+# Below this length the base64 overhead isn't worth it
+TYPED_ARRAY_MIN_LENGTH = 16
+
+# Properties plotly.js never reads as typed arrays
+SKIPPED_KEYS = {'geojson', 'layer', 'layers', 'range'}
+
+TYPED_ARRAY_DTYPES = {
+    'int8': 'i1',
+    'uint8': 'u1',
+    'int16': 'i2',
+    'uint16': 'u2',
+    'int32': 'i4',
+    'uint32': 'u4',
+    'float32': 'f4',
+    'float64': 'f8',
+}
+
+def smallest_int_dtype(values):
+    # plotly.js has no 64 bit integer arrays
+    candidates = ['uint8', 'uint16', 'uint32'] if values.dtype.kind == 'u' else ['int8', 'int16', 'int32']
+    min_val, max_val = values.min(), values.max()
+    for dtype in candidates:
+        info = np.iinfo(dtype)
+        if info.min <= min_val and max_val <= info.max:
+            return dtype
+    return None
+
+def typed_array(values):
+    if values.dtype.kind not in 'iuf' or values.ndim > 2 or len(values) < TYPED_ARRAY_MIN_LENGTH:
+        return values
+
+    if values.dtype.kind in 'iu':
+        dtype = smallest_int_dtype(values)
+        if dtype is None:
+            return values
+        values = values.astype(dtype)
+
+    dtype = str(values.dtype)
+    if dtype not in TYPED_ARRAY_DTYPES:
+        return values
+
+    result = {
+        'dtype': TYPED_ARRAY_DTYPES[dtype],
+        'bdata': base64.b64encode(np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<'))).decode('ascii'),
+    }
+    if values.ndim == 2:
+        result['shape'] = f'{values.shape[0]}, {values.shape[1]}'
+    return result
+
+def encode_arrays(obj, encode=typed_array):
+    if isinstance(obj, dict):
+        return {
+            key: value if key in SKIPPED_KEYS else encode_arrays(value, encode)
+            for key, value in obj.items()
+        }
+    if isinstance(obj, (list, tuple)):
+        return [ encode_arrays(value, encode) for value in obj ]
+    if isinstance(obj, np.ndarray):
+        return encode(obj)
+    return obj
+
+def plain_list(values):
+    # plotly >= 6 would otherwise send numeric arrays as typed arrays anyway.
+    # Dates and strings are left to plotly's own serializer.
+    if values.dtype.kind not in 'iuf':
+        return values
+    return values.tolist()
+
+def figure_json(fig, encoding=None):
+    '''
+    The figure as a dict for dcc.Graph, with its numeric arrays encoded as
+    typed arrays or plain lists, per FIGURE_ENCODING.
+    '''
+    encoding = encoding or FIGURE_ENCODING
+
+    figure = {
+        'data': [ trace.to_plotly_json() for trace in fig.data ],
+        'layout': fig.layout.to_plotly_json(),
+    }
+
+    if encoding == 'typed':
+        return encode_arrays(figure)
+    if encoding == 'lists':
+        return encode_arrays(figure, plain_list)
+    raise ValueError(f'Unknown figure encoding: {encoding!r}')
@@ -0,0 +1,62 @@
+import os
+from dash import dcc
+from dash import html
+
+# Graphs are only mounted while they are near the viewport. Each one is
+# swapped for a VirtualGraph, which keeps the graph in a dcc.Store and
+# leaves its holder empty. main.js clicks the hidden toggle whenever the
+# wrapper comes into or goes out of range, and the clientside callback in
+# app.py mounts the stored graph on odd clicks and unmounts it on even ones.
+VIRTUAL_GRAPHS = os.environ.get('EADATA_VIRTUAL_GRAPHS', '1') != '0'
+
+class VirtualGraph(html.Div):
+
+    def __init__(self, graph, key):
+
+        super().__init__(
+            [
+                dcc.Store(
+                    id={'type': 'virtual-graph-store', 'graph': key},
+                    # the graph's JSON, as stores can't hold components
+                    data=graph.to_plotly_json(),
+                ),
+                html.Div(
+                    id={'type': 'virtual-graph-toggle', 'graph': key},
+                    className='virtual-graph-toggle',
+                ),
+                html.Div(
+                    id={'type': 'virtual-graph', 'graph': key},
+                    className='virtual-graph-holder',
+                ),
+            ],
+            className='virtual-graph',
+        )
+
+def virtualize(component, prefix, keep_mounted=()):
+    '''
+    Replaces every dcc.Graph under component with a VirtualGraph, except
+    those whose id is in keep_mounted (e.g. callback outputs). Keys are
+    numbered within prefix, so the same tree always gets the same ids
+    whichever worker builds it.
+    '''
+
+    count = 0
+
+    def visit(children):
+        nonlocal count
+
+        if isinstance(children, (list, tuple)):
+            return [ visit(child) for child in children ]
+
+        if isinstance(children, dcc.Graph):
+            if getattr(children, 'id', None) in keep_mounted:
+                return children
+            count += 1
+            return VirtualGraph(children, f'{prefix}-{count}')
+
+        if hasattr(children, 'children'):
+            children.children = visit(children.children)
+
+        return children
+
+    return visit(component)
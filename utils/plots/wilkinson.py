@@ -1,7 +1,86 @@
-from utils.plots.scatter import Scatter
-from collections import Counter
+from dash import dcc
+from utils.plots.scatter import scatter_figure
+from utils.plots.figure_cache import cached_figure
+import numpy as np
+import pandas as pd
+from utils.hover import template_columns
 
-class Wilkinson(Scatter):
+def trim_text(texts, max_len):
+    return texts.where(texts.str.len() < max_len, texts.str[:max_len-3] + '...')
+
+def wilkinson_figure(
+    df,
+    value='value',
+    bins=20,
+    text=None,
+    log_y=False,
+    hover=None,
+    hover_template=None,
+    **kwargs,
+):
+
+    values = df[value]
+    min_val = values.min()
+    max_val = values.max()
+    delta = (max_val - min_val) / bins
+
+    # Each value goes in the middle of its bin
+    num_deltas = ((values - min_val) / delta).round()
+    bin_values = min_val + delta * (num_deltas + 0.5)
+
+    # Dots are stacked in the order of df within each bin
+    bin_groups = bin_values.groupby(bin_values)
+    counts = bin_groups.cumcount() + 1
+    bin_sizes = bin_groups.transform('size')
+
+    bin_col = f'{value}_bin'
+    count_col = f'{value}_count'
+    plot_df = pd.DataFrame({
+        bin_col: bin_values,
+        count_col: counts,
+    })
+
+    if text:
+        texts = df[text]
+
+        # if the dot is in a row by itself then show its text
+        alone = (counts == 1) & (bin_sizes == 1)
+        # if there are two dots in a row, show both of their text on the second
+        pair = (counts == 2) & (bin_sizes == 2)
+        previous_texts = texts.groupby(bin_values).shift()
+
+        text_col = f'{value}_text'
+        plot_df[text_col] = np.where(
+            alone,
+            trim_text(texts, 40),
+            np.where(pair, trim_text(previous_texts, 20) + ', ' + trim_text(texts, 20), ''),
+        )
+    else:
+        text_col = None
+
+    if hover_template:
+        for col in template_columns(hover_template):
+            plot_df[col] = df[col]
+    elif hover:
+        plot_df[hover] = df[hover]
+
+    # Other columns scatter_figure reads from the frame
+    for col in (kwargs.get('size'), kwargs.get('color')):
+        if col is not None:
+            plot_df[col] = df[col]
+
+    return scatter_figure(
+        df = plot_df,
+        y = bin_col,
+        x = count_col,
+        text = text_col,
+        hover = hover,
+        hover_template = hover_template,
+        transparent = False,
+        **kwargs,
+    )
+
+class Wilkinson(dcc.Graph):
 
     def __init__(
         self,
@@ -10,58 +89,22 @@ class Wilkinson(Scatter):
         bins=20,
         text=None,
         log_y=False,
+        hover=None,
+        hover_template=None,
         **kwargs,
     ):
 
-        min_val = df[value].min()
-        max_val = df[value].max()
-        delta = (max_val - min_val) / bins
-
-        def bin_value(value):
-            num_deltas = round( (value - min_val) / delta )
-            return min_val + delta * (num_deltas + 0.5)
-
-        bin_col = f'{value}_bin'
-        df[bin_col] = df[value].apply(bin_value)
-
-        bin_counter = Counter()
-        def get_count(value):
-            bin_counter[value] += 1
-            return bin_counter[value]
-        count_col = f'{value}_count'
-        df[count_col] = df[bin_col].apply(get_count)
-
-        def trim_text(text, max_len):
-            if len(text) < max_len:
-                return text
-            return text[:max_len-3] + '...'
-
-        def get_text(row):
-            bin_value = row[bin_col]
-            row_count = row[count_col]
-            display_text = row[text]
-            # if the dot is in a row by itself then show its text
-            if row_count == 1 and bin_counter[bin_value] == 1:
-                return trim_text(display_text, 40)
-            # if there are two dots in a row, show both of their text
-            elif row_count == 2 and bin_counter[bin_value] == 2:
-                other_text = df.loc[ (df[bin_col]==bin_value) & (df[count_col]==1), text ].iat[0]
-                return trim_text(other_text, 20) + ', ' + trim_text(display_text, 20)
-            # otherwise return an empty string
-            else:
-                return ''
-
-        if text:
-            text_col = f'{value}_text'
-            df[text_col] = df.apply(get_text, axis=1)
-        else:
-            text_col = None
-
         super().__init__(
-            df = df,
-            y = bin_col,
-            x = count_col,
-            text = text_col,
-            transparent = False,
-            **kwargs,
+            figure = cached_figure(
+                wilkinson_figure,
+                df,
+                value = value,
+                bins = bins,
+                text = text,
+                log_y = log_y,
+                hover = hover,
+                hover_template = hover_template,
+                **kwargs,
+            ),
+            responsive = True,
         )
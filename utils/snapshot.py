@@ -0,0 +1,159 @@
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+from dash import dcc
+from dash import html
+from dash import dash_table
+from dash._utils import to_json
+import dash_dangerously_set_inner_html
+import visdcc
+
+from utils.data_cache import source_stats, file_hash, sources_unchanged
+
+# A snapshot is the finished layout, every section and the datasets the
+# callbacks need, built once per data version by build.py:
+#
+#   build/<data version>/manifest.json
+#   build/<data version>/layout.json
+#   build/<data version>/sections.json
+#   build/<data version>/datasets/<name>.parquet
+#
+# Workers load the snapshot for the current data version when there is
+# one, and otherwise build everything live.
+SNAPSHOT_DIR = os.environ.get('EADATA_SNAPSHOT_DIR', './build')
+
+# Snapshots of older data versions kept alongside the current one
+SNAPSHOTS_KEPT = 3
+
+NAMESPACES = {
+    'dash_core_components': dcc,
+    'dash_html_components': html,
+    'dash_table': dash_table,
+    'dash_dangerously_set_inner_html': dash_dangerously_set_inner_html,
+    'visdcc': visdcc,
+}
+
+# The raw data the layout is built from. A snapshot records the mtime, size
+# and sha1 of every file here and is only used while they are unchanged,
+# whether the data was refreshed through refresh_data() or edited by hand.
+# Parquet caches, the VERSION marker and dot files (locks, partial writes)
+# are left out.
+DATA_DIR = './assets/data'
+DERIVED_DATA_FILES = {'VERSION'}
+
+def data_files():
+    for directory, dirs, names in os.walk(DATA_DIR):
+        dirs.sort()
+        for name in sorted(names):
+            if name.startswith('.') or name.endswith('.parquet') or name in DERIVED_DATA_FILES:
+                continue
+            yield os.path.join(directory, name)
+
+def data_stats():
+    stats = source_stats(data_files())
+    for path in stats:
+        stats[path]['sha1'] = file_hash(path)
+    return stats
+
+def snapshot_path(version):
+    return os.path.join(SNAPSHOT_DIR, version)
+
+def component_from_json(obj):
+    # Only children hold components; other props (e.g. a virtual graph's
+    # stored figure) stay as plain JSON
+    if isinstance(obj, list):
+        return [ component_from_json(child) for child in obj ]
+    if isinstance(obj, dict) and obj.keys() == {'props', 'type', 'namespace'}:
+        props = dict(obj['props'])
+        if 'children' in props:
+            props['children'] = component_from_json(props['children'])
+        return getattr(NAMESPACES[obj['namespace']], obj['type'])(**props)
+    return obj
+
+def write_snapshot(version, layout, sections, datasets, settings, sources):
+
+    path = snapshot_path(version)
+    tmp_path = f'{path}.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(os.path.join(tmp_path, 'datasets'))
+
+    with open(os.path.join(tmp_path, 'layout.json'), 'w') as f:
+        f.write(to_json(layout))
+    with open(os.path.join(tmp_path, 'sections.json'), 'w') as f:
+        f.write(to_json(sections))
+    for name, df in datasets.items():
+        df.to_parquet(os.path.join(tmp_path, 'datasets', f'{name}.parquet'))
+
+    # Written last, so a snapshot without one is incomplete
+    with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+        json.dump(
+            {
+                'version': version,
+                'built_at': time.time(),
+                'settings': settings,
+                'sources': sources,
+                'sections': list(sections),
+                'datasets': list(datasets),
+            },
+            f,
+            indent=2,
+        )
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+    prune_snapshots(keep=version)
+    return path
+
+def prune_snapshots(keep):
+    versions = sorted(
+        (
+            name for name in os.listdir(SNAPSHOT_DIR)
+            if name != keep and os.path.exists(os.path.join(SNAPSHOT_DIR, name, 'manifest.json'))
+        ),
+        key=lambda name: os.path.getmtime(os.path.join(SNAPSHOT_DIR, name)),
+    )
+    for name in versions[:max(len(versions) - SNAPSHOTS_KEPT, 0)]:
+        shutil.rmtree(os.path.join(SNAPSHOT_DIR, name), ignore_errors=True)
+
+def read_snapshot(version, settings):
+    '''
+    Returns (layout, sections, datasets) from the snapshot of this data
+    version, or None if there isn't one built with the same settings.
+    '''
+
+    path = snapshot_path(version)
+    try:
+        with open(os.path.join(path, 'manifest.json'), 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if manifest['settings'] != settings:
+        print(f'Snapshot {path} was built with other settings, building live')
+        return None
+
+    if not sources_unchanged(manifest.get('sources'), source_stats(data_files())):
+        print(f'Snapshot {path} was built from other data, building live')
+        return None
+
+    try:
+        with open(os.path.join(path, 'layout.json'), 'r') as f:
+            layout = component_from_json(json.load(f))
+        with open(os.path.join(path, 'sections.json'), 'r') as f:
+            sections = {
+                section_id: component_from_json(children)
+                for section_id, children in json.load(f).items()
+            }
+        datasets = {
+            name: pd.read_parquet(os.path.join(path, 'datasets', f'{name}.parquet'))
+            for name in manifest['datasets']
+        }
+    except Exception as e:
+        print(f'Could not load snapshot {path}: {e}')
+        return None
+
+    return layout, sections, datasets